@@ -0,0 +1,218 @@
+"""Headless benchmarks for data loading, session persistence and dashboard aggregation.
+
+Run from the repository root, e.g.::
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output bench.json
+
+Every size gets a fresh synthetic bank and progress files in a temporary directory;
+the app's data directory is pointed there, so the real ``data/`` is never touched.
+Results are written as JSON (one entry per benchmark and size) for comparing runs.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from diskcache import Cache
+
+import utils
+import utils.session
+from benchmarks.synthetic import GCP_PRODUCTS, GCP_TOPICS, write_bank, write_progress
+from models.progress import AnswerEvent
+from utils import aggregates, api, blueprint, related, repository, scheduler, search
+
+ROOT = Path(__file__).resolve().parent.parent
+DASHBOARD = ROOT / "🏠_Dashboard.py"
+QUIZ_MODE = ROOT / "pages" / "3_🤔_Quiz_Mode.py"
+
+
+def measure(fn: Callable, repeat: int, setup: Callable | None = None) -> dict:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "mean_ms": statistics.fmean(timings),
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+    }
+
+
+def reset_caches():
+    repository.invalidate()
+    aggregates.invalidate()
+    scheduler.invalidate()
+    search.invalidate()
+    blueprint.invalidate()
+    related.invalidate()
+
+
+def configure(data_dir: Path):
+    utils.DATA_DIR = data_dir
+    utils.session.cache = Cache(str(data_dir / "cache"))
+    reset_caches()
+
+
+def data_benchmarks(size: int, repeat: int, question_ids: list[int]) -> dict[str, dict]:
+    results = {}
+    path = utils.current_bank().quiz_file
+    version = (repository.file_version(path), None)
+
+    results["parse_validate"] = measure(lambda: repository.parse_bank(path, version), repeat)
+    utils.load_question_bank()
+    results["bank_cached"] = measure(utils.load_question_bank, repeat)
+    results["offset_index_build"] = measure(lambda: repository.QuestionIndex(path, version), repeat)
+    index = repository.get_index(path)
+    sample = random.Random(1).sample(question_ids, min(100, size))
+    results["question_fetch_100"] = measure(
+        lambda: [index.read(i) for i in sample], repeat, setup=index.read.cache_clear
+    )
+
+    results["load_progress"] = measure(utils.load_progress, repeat)
+    progress = utils.load_progress()
+
+    def start_round():
+        incorrect, not_answered, _ = utils.load_quizzes(progress)
+        ids = [q.id for q in not_answered + incorrect]
+        random.shuffle(ids)
+
+    results["round_start"] = measure(start_round, repeat)
+
+    balanced = blueprint.Blueprint(
+        shares={topic: 0.15 for topic in GCP_TOPICS[:6]},
+        product_min={GCP_PRODUCTS[0]: 5},
+        product_max={GCP_PRODUCTS[1]: 1},
+    )
+    results["blueprint_index_build"] = measure(
+        utils.load_tag_index, max(1, repeat // 2), setup=lambda: blueprint.invalidate(utils.current_bank().quiz_file)
+    )
+    results["blueprint_round_60"] = measure(lambda: api.blueprint_round_ids(60, balanced), repeat)
+
+    counter = iter(range(10**9))
+
+    def save_one():
+        utils.record_answers([AnswerEvent(id=question_ids[next(counter) % size], correct=True, ts=time.time())])
+
+    results["progress_save_1"] = measure(save_one, repeat)
+
+    for field in ("gcp_topics", "gcp_products", "ml_topics"):
+        results[f"topic_stats_cold_{field}"] = measure(
+            lambda f=field: utils.compute_topic_stats(f), repeat, setup=aggregates.invalidate
+        )
+        results[f"topic_stats_warm_{field}"] = measure(lambda f=field: utils.compute_topic_stats(f), repeat)
+    results["topic_distribution_warm"] = measure(utils.compute_topic_distribution, repeat)
+
+    results["scheduler_build"] = measure(utils.load_scheduler, repeat, setup=scheduler.invalidate)
+    results["scheduler_due_20"] = measure(lambda: utils.load_scheduler().due(20), repeat)
+
+    results["search_index_build"] = measure(
+        lambda: utils.search_questions("pipeline"),
+        max(1, repeat // 2),
+        setup=lambda: (search.invalidate(), search.index_file(utils.load_question_bank()).unlink(missing_ok=True)),
+    )
+    results["search_query"] = measure(lambda: utils.search_questions("stream autosc"), repeat)
+
+    first = question_ids[0]
+    results["related_index_build"] = measure(
+        lambda: utils.related_questions(first),
+        max(1, repeat // 2),
+        setup=lambda: (related.invalidate(), related.index_file(utils.load_question_bank()).unlink(missing_ok=True)),
+    )
+    results["related_query_5"] = measure(lambda: utils.related_questions(first, 5), repeat)
+    return results
+
+
+def ui_benchmarks(repeat: int) -> dict[str, dict]:
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    results["dashboard_render"] = measure(lambda: AppTest.from_file(str(DASHBOARD), default_timeout=600).run(), repeat)
+
+    at = AppTest.from_file(str(QUIZ_MODE), default_timeout=600)
+    at.run()
+    results["quiz_page_render"] = measure(at.run, repeat)
+
+    at.button[0].click().run()  # Start Round
+    if at.exception:
+        raise RuntimeError(f"Quiz Mode failed: {at.exception[0].value}")
+
+    def click(prefix: str):
+        pos = at.session_state.quiz_mode_pos
+        if at.radio:
+            at.radio[0].set_value(at.radio[0].options[0])
+        else:
+            at.checkbox[0].check()
+        at.button(key=f"{prefix}_{pos}").click().run()
+
+    def submit_and_next():
+        click("submit")
+        click("next")
+
+    results["quiz_submit_next"] = measure(submit_and_next, repeat)
+    # the state cache_session writes on every Submit/Next click
+    state = {
+        "pos": at.session_state.quiz_mode_pos,
+        "progress": at.session_state.quiz_mode_round_progress,
+        "answers": at.session_state.quiz_mode_round_answers,
+    }
+    results["session_persist"] = measure(lambda: utils.session.write_state(at.session_state.session_id, state), repeat)
+    return results
+
+
+def run(sizes: list[int], repeat: int, ui: bool) -> list[dict]:
+    rows = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="quiz-bench-") as tmp:
+            data_dir = Path(tmp)
+            question_ids = write_bank(data_dir / "quizzes.jsonl", size)
+            write_progress(data_dir / "progress.json", data_dir / "progress.log.jsonl", question_ids)
+            configure(data_dir)
+            results = data_benchmarks(size, repeat, question_ids)
+            if ui:
+                results.update(ui_benchmarks(repeat))
+            utils.session.cache.close()
+            for name, stats in results.items():
+                rows.append({"benchmark": name, "size": size, **stats})
+                print(f"{size:>8} {name:<36} {stats['median_ms']:>10.2f} ms", file=sys.stderr)
+    reset_caches()
+    return rows
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="question bank sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument("--no-ui", action="store_true", help="skip the Streamlit AppTest benchmarks")
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": run(args.sizes, args.repeat, not args.no_ui),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold start report: import time per module and first-paint time per page.
+
+Run from the repository root, e.g.::
+
+    python -m benchmarks.startup --output startup.json
+
+Every measurement runs in a fresh interpreter so nothing is already imported or cached.
+Module times come from ``python -X importtime`` (cumulative, including dependencies);
+page times are the first and a second (warm) ``AppTest`` run of each page against the
+real ``data/`` directory, which is only read.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = [
+    "streamlit",
+    "pandas",
+    "numpy",
+    "plotly.express",
+    "pyvis.network",
+    "utils",
+    "utils.products",
+    "utils.search",
+    "utils.export",
+    "dashboard",
+]
+PAGES = [ROOT / "🏠_Dashboard.py", *sorted((ROOT / "pages").glob("*.py"))]
+
+_PAINT = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+warm = time.perf_counter() - start
+print(json.dumps({"first_paint_ms": first * 1000, "rerun_ms": warm * 1000, "errors": len(at.exception)}))
+"""
+
+
+def import_time(module: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, us_self, us_cumulative, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        if name == module:
+            cumulative = int(us_cumulative)
+    return {"module": module, "import_ms": cumulative / 1000}
+
+
+def first_paint(page: Path) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _PAINT, str(page)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {"page": page.name, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-pages", action="store_true", help="only measure module imports")
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    imports = []
+    for module in MODULES:
+        imports.append(import_time(module))
+        print(f"{module:<40} {imports[-1]['import_ms']:>10.1f} ms", file=sys.stderr)
+    pages = []
+    if not args.no_pages:
+        for page in PAGES:
+            pages.append(first_paint(page))
+            print(
+                f"{page.name:<40} {pages[-1]['first_paint_ms']:>10.1f} ms first, {pages[-1]['rerun_ms']:.1f} ms rerun",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {"timestamp": time.time(), "python": platform.python_version(), "platform": platform.platform()},
+        "imports": imports,
+        "pages": pages,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Synthetic question banks and progress files for the benchmarks."""
+
+import json
+import random
+import time
+from pathlib import Path
+
+from models.progress import AnswerEvent
+
+WORDS = (
+    "model training pipeline feature store dataset latency batch streaming prediction endpoint monitoring "
+    "drift retraining tuning hyperparameter accuracy recall precision embedding vector tensor gpu tpu "
+    "bigquery dataflow pubsub storage vertex kubeflow notebook container registry serving autoscaling"
+).split()
+GCP_TOPICS = [f"Topic {i}" for i in range(60)]
+GCP_PRODUCTS = [f"Product {i}" for i in range(120)]
+ML_TOPICS = [f"ML topic {i}" for i in range(80)]
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_record(rng: random.Random, question_id: int) -> dict:
+    multiple = rng.random() < 0.2
+    options = [f"{chr(65 + i)}. {_sentence(rng, 14)}" for i in range(4)]
+    return {
+        "id": question_id,
+        "mode": "multiple_choice" if multiple else "single_choice",
+        "question": " ".join(_sentence(rng, 18) for _ in range(4)),
+        "options": options,
+        "answer": sorted(rng.sample(range(4), 2)) if multiple else rng.randrange(4),
+        "explanation": "\n\n".join(_sentence(rng, 40) for _ in range(6)),
+        "ml_topics": rng.sample(ML_TOPICS, 3),
+        "gcp_products": rng.sample(GCP_PRODUCTS, 3),
+        "gcp_topics": rng.sample(GCP_TOPICS, 4),
+    }
+
+
+def write_bank(path: Path, size: int, seed: int = 0) -> list[int]:
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for question_id in range(1, size + 1):
+            f.write(json.dumps(make_record(rng, question_id)) + "\n")
+    return list(range(1, size + 1))
+
+
+def write_progress(snapshot_file: Path, log_file: Path, question_ids: list[int], answered: float = 0.5, seed: int = 0):
+    """Write a snapshot covering most answers plus a log tail with the most recent ones."""
+    rng = random.Random(seed)
+    picked = rng.sample(question_ids, int(len(question_ids) * answered))
+    split = len(picked) * 9 // 10
+    snapshot_file.write_text(json.dumps({str(i): rng.random() < 0.6 for i in picked[:split]}), encoding="utf-8")
+    now = time.time()
+    with log_file.open("w", encoding="utf-8") as f:
+        for i in picked[split:]:
+            event = AnswerEvent(id=i, correct=rng.random() < 0.6, ts=now - rng.random() * 30 * 86400, choice=[0])
+            f.write(event.model_dump_json() + "\n")
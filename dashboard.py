@@ -1,15 +1,25 @@
-import pandas as pd
-import plotly.express as px
+import time
+
 import streamlit as st
 
-from utils import PROGRESS_FILE, QUIZ_FILE, compute_stats, load_progress, load_quizzes
+from utils import (
+    compute_readiness,
+    compute_stats,
+    compute_topic_distribution,
+    compute_topic_stats,
+    load_calibration,
+    load_progress,
+    load_question_bank,
+    load_telemetry_summary,
+)
+from utils.irt import EXAM_SIZE
 
 
 def show_dashboard():
     progress = load_progress()
-    quizzes = load_quizzes(progress)
+    bank = load_question_bank()
 
-    total = len(quizzes[0]) + len(quizzes[1]) + len(quizzes[2])
+    total = len(bank)
     _, correct, wrong, _ = compute_stats(progress)
     unanswered = total - (correct + wrong)
     col1, col2, col3, col4 = st.columns(4)
@@ -17,34 +27,75 @@ def show_dashboard():
     col2.metric("Unanswered", unanswered)
     col3.metric("Correct", correct)
     col4.metric("Wrong", wrong)
+    if total == 0:
+        return {"total": total, "correct": correct, "wrong": wrong, "unanswered": unanswered}
+    show_readiness()
     show_topic_distribution()
-    if PROGRESS_FILE.exists() and len(PROGRESS_FILE.read_text().strip()) > 0:
+    if progress:
         show_knowledge_gaps(topic_field="gcp_topics")
         show_knowledge_gaps(topic_field="gcp_products")
         show_knowledge_gaps(topic_field="ml_topics")
+        show_hardest_questions()
     else:
         st.info("No progress found. Answer some quizzes to see your knowledge gaps.", icon="ℹ️")
 
     return {"total": total, "correct": correct, "wrong": wrong, "unanswered": unanswered}
 
 
+def show_readiness():
+    readiness = compute_readiness()
+    if readiness is None:
+        return
+    calibration = load_calibration()
+    st.title("🎯 Exam Readiness")
+    c1, c2, c3 = st.columns(3)
+    c1.metric(
+        "Ability",
+        f"{readiness['ability']:+.2f} ± {readiness['ability_se']:.2f}",
+        help="On the scale of the calibration cohort: 0 is the average learner, 1 is one standard deviation above.",
+    )
+    c2.metric("Expected exam score", f"{readiness['expected_score']:.0%}")
+    c3.metric(
+        "Pass probability",
+        f"{readiness['pass_probability']:.0%}",
+        help=f"Chance of {readiness['pass_mark']:.0%} or more on {EXAM_SIZE} random questions (assumed pass mark).",
+    )
+    fitted = time.strftime("%Y-%m-%d", time.localtime(calibration.fitted))
+    st.caption(
+        f"Question difficulties calibrated on {len(calibration.abilities)} learners ({fitted}); "
+        "the estimate only uses your answers to calibrated questions."
+    )
+    with st.expander("Question difficulty"):
+        st.dataframe(
+            calibration.frame(load_question_bank(), readiness["ability"]),
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "difficulty": st.column_config.NumberColumn("difficulty", format="%.2f"),
+                "discrimination": st.column_config.NumberColumn("discrimination", format="%.2f"),
+                "average_learner": st.column_config.ProgressColumn(
+                    "average learner", min_value=0.0, max_value=1.0, format="percent"
+                ),
+                "your_chance": st.column_config.ProgressColumn(
+                    "your chance", min_value=0.0, max_value=1.0, format="percent"
+                ),
+            },
+        )
+
+
 def show_topic_distribution():
-    questions = pd.read_json(QUIZ_FILE, lines=True)
-    df = questions[["id", "gcp_topics"]].explode("gcp_topics").rename(columns={"gcp_topics": "topic"})
-    df.dropna(subset=["topic"], inplace=True)
+    topic_stats = compute_topic_distribution("gcp_topics")
     st.title("📚 Topic Distribution")
 
     with st.container(border=True):
         c1, c2, c3 = st.columns([1, 1, 2], vertical_alignment="center")
 
         top_n = c1.slider("Top N topics", 5, 50, 20)
-        total_rows = len(df)
-        unique_topics = df["topic"].nunique(dropna=True)
+        total_rows = int(topic_stats["count"].sum())
+        unique_topics = len(topic_stats)
         c3.metric("Rows (topic tags)", f"{total_rows:,}", help="After explode(); one row per (question, topic) tag.")
         c2.metric("Unique topics", f"{unique_topics:,}")
 
-    # --- Compute topic stats ---
-    topic_stats = df["topic"].dropna().astype(str).value_counts().rename_axis("topic").reset_index(name="count")
     topic_stats["percent"] = (topic_stats["count"] / topic_stats["count"].sum()) * 100.0
 
     # Keep top N
@@ -57,6 +108,8 @@ def show_topic_distribution():
     value_label = "Count"
 
     # --- Plotly: modern horizontal bar chart ---
+    import plotly.express as px
+
     fig = px.bar(
         plot_df,
         x=value_col,
@@ -97,30 +150,14 @@ def show_topic_distribution():
 
 
 def show_knowledge_gaps(topic_field: str = "gcp_topics"):
-    questions = pd.read_json(QUIZ_FILE, lines=True)
-    progress = pd.read_json(PROGRESS_FILE, orient="index").rename(columns={0: "answer_correct"})
-    questions = questions.merge(progress, left_on="id", right_index=True, how="left")
-
-    df = questions[["id", "answer_correct", topic_field]].explode(topic_field).rename(columns={topic_field: "topic"})
-
-    df.dropna(subset=["answer_correct"], inplace=True)
-
     topic_field_name = topic_field.replace("_", " ").title()
     st.title(f"🧠 Knowledge Gap per {topic_field_name}")
 
     # --- Compute topic stats ---
-    topic_stats = (
-        df.dropna(subset=["topic"])
-        .assign(topic=lambda d: d["topic"].astype(str))
-        .groupby("topic")
-        .agg(
-            attempts=("answer_correct", "count"),
-            correct=("answer_correct", "sum"),
-            accuracy=("answer_correct", "mean"),
-        )
-        .reset_index()
-        .rename(columns={"ml_topics": "topic"})
-    )
+    topic_stats = compute_topic_stats(topic_field)
+    if topic_stats.empty:
+        st.info("No answered questions are tagged with this field yet.")
+        return
 
     # Safety: ensure boolean -> numeric
     # (If answer_correct is already bool, sum/mean work; if string, fix upstream)
@@ -183,6 +220,8 @@ def show_knowledge_gaps(topic_field: str = "gcp_topics"):
     plot_df = plot_df.head(top_k).copy()
 
     # --- Plotly chart (modern horizontal bars) ---
+    import plotly.express as px
+
     fig = px.bar(
         plot_df,
         x=x_col,
@@ -221,3 +260,36 @@ def show_knowledge_gaps(topic_field: str = "gcp_topics"):
     fig.update_yaxes(showgrid=False)
 
     st.plotly_chart(fig, width="stretch")
+
+
+def show_hardest_questions():
+    summary = load_telemetry_summary()
+    if not summary.answered:
+        return
+    st.title("🧪 Hardest Questions")
+    bank = load_question_bank()
+
+    min_answers = st.slider("Minimum answers", 1, 20, 3, key="hardest_min_answers")
+    hardest = summary.hardest(bank, min_answers=min_answers)
+    suspects = int(hardest["suspect_key"].sum())
+    if suspects:
+        st.warning(
+            f"{suspects} questions have one wrong option picked by most learners; check their answer keys.", icon="🔑"
+        )
+    st.dataframe(
+        hardest,
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "error_rate": st.column_config.ProgressColumn("error rate", min_value=0.0, max_value=1.0, format="percent"),
+            "median_seconds": st.column_config.NumberColumn("median seconds", format="%.1f"),
+        },
+    )
+
+    st.markdown("#### Most chosen distractors")
+    st.dataframe(
+        summary.distractor_frame(bank),
+        width="stretch",
+        hide_index=True,
+        column_config={"share_of_answers": st.column_config.NumberColumn("share of answers", format="percent")},
+    )
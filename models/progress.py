@@ -0,0 +1,33 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class AnswerEvent(BaseModel):
+    id: int  # question id
+    correct: bool
+    ts: float  # unix timestamp of the answer
+    choice: list[int] = []  # selected option indexes
+    elapsed: float | None = None  # seconds from showing the question to submitting it
+
+
+class ReviewState(BaseModel):
+    """Spaced-repetition state of one question (SM-2)."""
+
+    ease: float = 2.5
+    interval: float = 0.0  # days until the next review
+    reps: int = 0  # consecutive correct answers
+    lapses: int = 0
+    due: float = 0.0  # unix timestamp of the next review
+
+
+class TelemetryEvent(BaseModel):
+    """One Quiz Mode interaction, kept for content analysis rather than progress."""
+
+    kind: Literal["shown", "answer", "skip", "restart"]
+    ts: float
+    session: str = ""
+    id: int | None = None  # question id; None for round-level events
+    choice: list[int] = []
+    correct: bool | None = None
+    elapsed: float | None = None  # seconds since the question was shown
@@ -2,6 +2,9 @@ from typing import Literal
 
 from pydantic import BaseModel
 
+# tag list fields of a question record, in the order they appear in quizzes.jsonl
+TAG_FIELDS = ("ml_topics", "gcp_products", "gcp_topics")
+
 
 class Question(BaseModel):
     id: int
@@ -10,3 +13,6 @@ class Question(BaseModel):
     options: list[str]
     answer: int | list[int]  # index of the correct option
     explanation: str | None = None
+    gcp_topics: list[str] = []
+    gcp_products: list[str] = []
+    ml_topics: list[str] = []
@@ -1,154 +1,22 @@
 # app.py
-import re
-
-import networkx as nx
 import pandas as pd
 import streamlit as st
 
-# PyVis for interactive graph inside Streamlit
-from pyvis.network import Network
-
-from utils import DATA_DIR
-
-
-def load_data():
-    df = pd.read_json(DATA_DIR / "gcp_products.jsonl", lines=True)
-    return df.to_dict(orient="records")
-
-
-DATA = load_data()
-
-
-# -----------------------------
-# Helpers
-# -----------------------------
-def normalize_token(x: str) -> str:
-    return re.sub(r"\s+", " ", x.strip())
-
-
-def extract_ui_tags(ui_list):
-    # lightweight tagging so users can filter
-    tags = set()
-    for ui in ui_list:
-        u = ui.lower()
-        if "console" in u or "web ui" in u:
-            tags.add("Console / Web UI")
-        if "python" in u or "sdk" in u or "client" in u:
-            tags.add("SDK / Client Libraries")
-        if "cli" in u or "gcloud" in u or "bq tool" in u:
-            tags.add("CLI")
-        if "rest" in u or "api" in u:
-            tags.add("API")
-        if "sql" in u:
-            tags.add("SQL")
-    return sorted(tags)
-
-
-def to_rows(data):
-    rows = []
-    for p in data:
-        rows.append(
-            {
-                "product_name": p["product_name"],
-                "entity_type": p.get("entity_type", ""),
-                "ui": p.get("ui", []),
-                "ui_tags": extract_ui_tags(p.get("ui", [])),
-                "connected_to": [normalize_token(x) for x in p.get("connected_to", [])],
-                "short_description": p.get("short_description", ""),
-                "use_cases": p.get("use_cases", []),
-                "not_used_when": p.get("not_used_when", []),
-            }
-        )
-    return rows
-
-
-def pyvis_html(G: nx.Graph, selected=None, focus_neighbors_depth=1):
-    """
-    Create a PyVis HTML graph.
-    - If selected is provided, we dim non-neighborhood nodes for learning focus.
-    """
-    net = Network(height="700px", width="100%", bgcolor="#0e1117", font_color="#e6e6e6", directed=False)
-    net.barnes_hut(gravity=-20000, central_gravity=0.3, spring_length=140, spring_strength=0.03, damping=0.09)
-
-    # neighborhood focus
-    focus_set = set()
-    if selected and selected in G:
-        focus_set.add(selected)
-        frontier = {selected}
-        for _ in range(focus_neighbors_depth):
-            nxt = set()
-            for n in frontier:
-                nxt |= set(G.neighbors(n))
-            focus_set |= nxt
-            frontier = nxt
-
-    for n, attrs in G.nodes(data=True):
-        node_type = attrs.get("node_type", "dependency")
-        title = f"<b>{n}</b><br/>Type: {node_type}"
-        if node_type == "product":
-            title += f"<br/>Entity: {attrs.get('entity_type', '')}"
-            shape = "box"
-            size = 22
-        else:
-            shape = "dot"
-            size = 14
-
-        # Visual emphasis: selected + neighborhood vs dimmed
-        if selected:
-            if n == selected:
-                opacity = 1.0
-                value = 40
-            elif n in focus_set:
-                opacity = 0.9
-                value = 22 if node_type == "product" else 16
-            else:
-                opacity = 0.2
-                value = 10
-        else:
-            opacity = 0.95
-            value = 22 if node_type == "product" else 14
-
-        net.add_node(
-            n,
-            label=n,
-            title=title,
-            shape=shape,
-            value=value,
-            opacity=opacity,
-        )
-
-    for u, v, attrs in G.edges(data=True):
-        edge_type = attrs.get("edge_type", "dependency_link")
-        width = 2 if edge_type == "product_link" else 1
-        net.add_edge(u, v, width=width)
-
-    return net.generate_html()
-
-
-def capability_matrix(rows):
-    """
-    Rows: products
-    Cols: dependencies (connected_to)
-    Value: True/False
-    """
-    deps = sorted({d for r in rows for d in r["connected_to"]})
-    mat = []
-    for r in rows:
-        s = set(r["connected_to"])
-        mat.append({"product_name": r["product_name"], **{d: (d in s) for d in deps}})
-    df = pd.DataFrame(mat).set_index("product_name")
-    return df
+from utils import compute_product_accuracy, load_product_graph, product_graph_html, select_bank, show_html_frame
 
 
 # -----------------------------
 # Streamlit UI
 # -----------------------------
 st.set_page_config(page_title="GCP Product Learning Map", layout="wide")
+select_bank()
 
 st.title("GCP Product Learning Map")
 st.caption("Comparison views to learn products and understand their connections.")
 
-rows = to_rows(DATA)
+graph = load_product_graph()
+rows = graph.rows
+accuracy = compute_product_accuracy()
 
 # Sidebar filters
 st.sidebar.header("Filters")
@@ -169,7 +37,7 @@ if not filtered:
     st.warning("No products match your filters.")
     st.stop()
 
-tabs = st.tabs(["Product Detail", "Capability Matrix"])
+tabs = st.tabs(["Product Detail", "Capability Matrix", "Similar products", "Quiz accuracy", "Graph"])
 
 with tabs[0]:
     st.subheader("Product details (learning view)")
@@ -183,6 +51,16 @@ with tabs[0]:
     with colB:
         st.markdown(f"### {r['product_name']}")
         st.write(r["short_description"])
+        stats = accuracy[accuracy["product"] == r["product_name"]]
+        if not stats.empty:
+            stat = stats.iloc[0]
+            if stat["answered"]:
+                st.info(
+                    f"{stat['questions']} questions test {r['product_name']}; "
+                    f"you answered {stat['answered']} and got {stat['accuracy']:.0f}% right."
+                )
+            else:
+                st.info(f"{stat['questions']} questions test {r['product_name']}; none answered yet.")
 
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -208,19 +86,74 @@ with tabs[0]:
 # ---- Tab 3: Capability matrix
 with tabs[1]:
     st.subheader("Capability matrix (shared connections)")
-    df = capability_matrix(filtered)
+    capabilities = graph.capabilities
+    filtered_names = [r["product_name"] for r in filtered]
 
     # show as counts + boolean grid
     st.caption("Rows are products, columns are dependencies (connected_to). True means the product connects to it.")
 
     # optionally sort dependencies by popularity
-    dep_counts = df.sum(axis=0).sort_values(ascending=False)
+    dep_counts = capabilities.top_dependencies(products=filtered_names)
     top_n = st.slider("Show top dependencies", 5, min(50, len(dep_counts)), min(20, len(dep_counts)))
-    top_cols = dep_counts.index[:top_n].tolist()
+    top_cols = [dep for dep, _ in dep_counts[:top_n]]
 
-    st.dataframe(df[top_cols].astype(bool), width="stretch")
+    st.dataframe(capabilities.frame(filtered_names, top_cols), width="stretch")
 
     st.markdown("##### Most shared dependencies")
-    shared = dep_counts.head(10).reset_index()
-    shared.columns = ["Dependency", "Connected products"]
+    shared = pd.DataFrame(dep_counts[:10], columns=["Dependency", "Connected products"])
     st.dataframe(shared, width="stretch")
+
+# ---- Tab 4: Similar products
+with tabs[2]:
+    st.subheader("Similar products")
+    capabilities = graph.capabilities
+    colA, colB = st.columns(2)
+
+    with colA:
+        base = st.selectbox("Products similar to", options=product_names, index=0, key="similar_to")
+        similar = capabilities.similar(base, n=15)
+        if similar:
+            st.caption("Ranked by Jaccard similarity of their connections.")
+            st.dataframe(
+                pd.DataFrame(similar, columns=["Product", "Similarity", "Shared connections"]),
+                width="stretch",
+                hide_index=True,
+            )
+        else:
+            st.info(f"No product shares a connection with {base}.")
+
+    with colB:
+        dependency = st.selectbox("Products connected to", options=capabilities.dependencies, key="sharing_dependency")
+        users = capabilities.products_with(dependency)
+        st.caption(f"{len(users)} products list {dependency} in their connections.")
+        for name in users:
+            st.write(f"- {name}")
+
+# ---- Tab 5: Quiz accuracy per product
+with tabs[3]:
+    st.subheader("Quiz accuracy per product")
+    st.caption("Questions are linked to products through their gcp_products tags.")
+    shown = accuracy[accuracy["is_product"] & accuracy["product"].isin(selected_product)]
+    st.dataframe(
+        shown.drop(columns="is_product").sort_values("questions", ascending=False),
+        width="stretch",
+        hide_index=True,
+        column_config={"accuracy": st.column_config.NumberColumn("accuracy", format="%.1f%%")},
+    )
+
+# ---- Tab 6: Product graph
+with tabs[4]:
+    st.subheader("Product graph")
+    colA, colB = st.columns([2, 1])
+    with colA:
+        focus = st.selectbox("Highlight product", options=["(none)", *product_names], index=0, key="graph_focus")
+    with colB:
+        depth = st.slider("Neighborhood depth", 1, 3, 1, key="graph_depth")
+
+    selected = None if focus == "(none)" else focus
+    if selected:
+        hood = graph.neighborhood(selected, depth)
+        st.caption(f"{len(hood) - 1} nodes within {depth} hop(s) of {selected}; everything else is dimmed.")
+    # rendering loads pyvis, so keep it off the first paint
+    if st.toggle("Show interactive graph", key="graph_show"):
+        show_html_frame(product_graph_html(selected, depth), height=720)
@@ -1,104 +1,213 @@
 import logging
 import random
+import time
 from pathlib import Path
 
 import streamlit as st
 
-from utils import compute_stats, load_progress, load_quizzes, save_progress, set_css_style
-from utils.session import cache_session, clear_session_cache, load_session
-
+from models.progress import AnswerEvent, TelemetryEvent
+from models.questions import TAG_FIELDS, Question
+from utils import (
+    compute_ability,
+    compute_stats,
+    get_question,
+    load_blueprint,
+    load_calibration,
+    load_product_links,
+    load_progress,
+    load_quizzes,
+    load_scheduler,
+    load_tag_index,
+    record_answers,
+    related_questions,
+    save_blueprint,
+    search_questions,
+    select_bank,
+    set_css_style,
+    track,
+)
+from utils.api import blueprint_round_ids, default_round_ids, grade
+from utils.blueprint import PRODUCT_FIELD, Blueprint
+from utils.irt import difficulty_label
+from utils.session import cache_round, cache_session, clear_session_cache, load_session, session_id
+
+select_bank()
 load_session()
 
 logger = logging.getLogger(__name__)
 
+DASHBOARD_PAGE = "🏠_Dashboard.py"
+
 set_css_style(Path("style.css"))
 
 
-def save_progress_click(progress):
-    saved = load_progress()
-    saved.update(progress)
-    save_progress(saved)
+def round_events() -> list[AnswerEvent]:
+    events = []
+    for p, res in st.session_state.quiz_mode_round_progress.items():
+        answer = st.session_state.quiz_mode_round_answers.get(p, {})
+        events.append(
+            AnswerEvent(
+                id=st.session_state.quiz_round_ids[p],
+                correct=res,
+                ts=answer.get("ts", time.time()),
+                choice=answer.get("choice", []),
+                elapsed=answer.get("elapsed"),
+            )
+        )
+    return events
+
+
+def track_event(kind: str, **fields):
+    track(TelemetryEvent(kind=kind, ts=time.time(), session=session_id(), **fields))
+
+
+def save_progress_click():
+    record_answers(round_events())
     clear_round_data()
-    st.success("Round results merged into overall progress.")
 
 
 def clear_round_data():
     st.session_state.quiz_in_progress = None
-    st.session_state.quizzes = []
+    st.session_state.quiz_round_ids = []
     st.session_state.quiz_mode_pos = 0
     st.session_state.quiz_mode_round_progress = {}
+    st.session_state.quiz_mode_round_answers = {}
+    st.session_state.pop("quiz_mode_shown", None)
     clear_session_cache()
 
 
-def start_new_round(quizzes):
-    random.shuffle(quizzes)
+def start_new_round(question_ids: list[int], shuffle=True):
+    if shuffle:
+        random.shuffle(question_ids)
     st.session_state.quiz_in_progress = True
-    st.session_state.quizzes = quizzes
+    st.session_state.quiz_round_ids = question_ids
     st.session_state.quiz_mode_pos = 0
     st.session_state.quiz_mode_round_progress = {}
+    st.session_state.quiz_mode_round_answers = {}
     st.session_state.quiz_mode_answered = False
-    cache_session()
+    st.session_state.pop("quiz_mode_shown", None)
+    cache_round()
     st.rerun()
 
 
-def show_quiz():
-    pos = st.session_state.quiz_mode_pos
-    if pos >= len(st.session_state.quizzes):
-        st.success("Round complete — no more questions in this shuffled round.")
-        asked, correct, wrong, pct = compute_stats(st.session_state.quiz_mode_round_progress)
-        st.markdown(f"Asked: {asked} — Correct: {correct} — Wrong: {wrong} — Success: {pct:.1f}%")
-        progress = {st.session_state.quizzes[p].id: res for p, res in st.session_state.quiz_mode_round_progress.items()}
-        if st.button(
-            "Save round results to overall progress", icon="💾", on_click=save_progress_click, args=(progress,)
-        ):
-            st.switch_page("app.py")
-
-        if st.button("Clear round data", icon="🗑️", on_click=clear_round_data):
-            st.switch_page("app.py")
-
+def submit_answer(q: Question, pos: int):
+    choice_key = f"choice_{pos}"
+    if q.mode == "multiple_choice":
+        choice_idx = [i for i in range(len(q.options)) if st.session_state.get(f"{choice_key}_{i}")]
+    else:
+        choice = st.session_state.get(choice_key)
+        choice_idx = [] if choice is None else [q.options.index(choice)]
+    if not choice_idx:
+        st.session_state.quiz_mode_no_choice = True
         return
+    correct = grade(q, choice_idx)
+    now = time.time()
+    elapsed = now - st.session_state.quiz_mode_shown[1]
+    st.session_state.quiz_mode_round_progress[pos] = correct
+    st.session_state.quiz_mode_round_answers[pos] = {"choice": choice_idx, "ts": now, "elapsed": elapsed}
+    track_event("answer", id=q.id, choice=choice_idx, correct=correct, elapsed=elapsed)
+    st.session_state.quiz_mode_answered = True
+    cache_session()
 
-    # show current question
-    quizzes = st.session_state.quizzes
-    q = quizzes[pos]
-    st.header(f"Question (#{q.id}) {pos + 1} / {len(st.session_state.quizzes)}")
 
-    question = q.question if "<p>" in q.question.lower() else f"<p>{q.question}</p>"
-    st.markdown(question, unsafe_allow_html=True)
+def next_question(q: Question):
+    if not st.session_state.quiz_mode_answered:
+        track_event("skip", id=q.id, elapsed=time.time() - st.session_state.quiz_mode_shown[1])
+    st.session_state.quiz_mode_pos += 1
+    st.session_state.quiz_mode_answered = False
+    cache_session()
+
 
+def practice_similar(question_ids: list[int], pos: int):
+    """Ask ``question_ids`` right after the current question; those already further on in the round move up."""
+    round_ids = st.session_state.quiz_round_ids
+    later = [question_id for question_id in round_ids[pos + 1 :] if question_id not in question_ids]
+    st.session_state.quiz_round_ids = round_ids[: pos + 1] + question_ids + later
+    cache_round()
+
+
+@st.fragment
+def answer_controls(q: Question, pos: int):
+    """Options of the current question; picking one reruns only this fragment."""
     # choice control keying by position to keep state per question
     choice_key = f"choice_{pos}"
     if q.mode == "single_choice":
-        choice = st.radio(
+        st.radio(
             "Choose an answer:",
             q.options,
             index=None,
             key=choice_key,
         )
     else:
-        choice = [0] * len(q.options)
         for i, answ in enumerate(q.options):
-            choice[i] = st.checkbox(
+            st.checkbox(
                 answ,
                 value=False,
                 key=f"{choice_key}_{i}",
             )
+
+
+def show_difficulty(q: Question):
+    """Calibrated difficulty of the question and this learner's predicted chance, if the bank is calibrated."""
+    calibration = load_calibration()
+    params = calibration.params(q.id) if calibration is not None else None
+    if params is None:
+        return
+    theta, _ = compute_ability()
+    chance = calibration.probability(theta, q.id)
+    st.caption(f"Difficulty: {difficulty_label(params[1])} · your predicted chance: {chance:.0%}")
+
+
+def show_round_complete():
+    st.success("Round complete — no more questions in this shuffled round.")
+    asked, correct, wrong, pct = compute_stats(st.session_state.quiz_mode_round_progress)
+    st.markdown(f"Asked: {asked} — Correct: {correct} — Wrong: {wrong} — Success: {pct:.1f}%")
+    if st.button("Save round results to overall progress", icon="💾", on_click=save_progress_click):
+        st.toast("Round results merged into overall progress.", icon="💾")
+        st.switch_page(DASHBOARD_PAGE)
+
+    if st.button("Clear round data", icon="🗑️", on_click=clear_round_data):
+        st.switch_page(DASHBOARD_PAGE)
+
+
+@st.fragment
+def show_quiz():
+    """The running round. Submit and Next rerun only this fragment, not the whole page."""
+    pos = st.session_state.quiz_mode_pos
+    question_ids = st.session_state.quiz_round_ids
+    if pos >= len(question_ids):
+        show_round_complete()
+        return
+
+    # show current question, fetched on demand by id
+    q = get_question(question_ids[pos])
+    if q is None:
+        logger.warning(f"Question {question_ids[pos]} no longer exists, skipping it.")
+        st.session_state.quiz_mode_pos += 1
+        cache_session()
+        st.rerun(scope="fragment")
+    st.header(f"Question (#{q.id}) {pos + 1} / {len(question_ids)}")
+    show_difficulty(q)
+    if st.session_state.get("quiz_mode_shown", (None, None))[0] != pos:
+        st.session_state.quiz_mode_shown = (pos, time.time())
+        track_event("shown", id=q.id)
+
+    question = q.question if "<p>" in q.question.lower() else f"<p>{q.question}</p>"
+    st.markdown(question, unsafe_allow_html=True)
+
+    answer_controls(q, pos)
     st.markdown("<br>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
-    if col1.button("✅ Submit", key=f"submit_{pos}", type="primary", disabled=st.session_state.quiz_mode_answered):
-        if not choice or (isinstance(choice, list) and not any(choice)):
-            st.warning("Please select at least one answer before submitting.")
-        else:
-            if q.mode == "multiple_choice":
-                choice_idx = set([i for i, val in enumerate(choice) if val])
-                st.session_state.quiz_mode_round_progress[pos] = choice_idx == set(q.answer)
-            else:
-                choice_idx = q.options.index(choice)
-                st.session_state.quiz_mode_round_progress[pos] = choice_idx == q.answer
-
-            st.session_state.quiz_mode_answered = True
-            cache_session()
-            st.rerun()
+    col1.button(
+        "✅ Submit",
+        key=f"submit_{pos}",
+        type="primary",
+        disabled=st.session_state.quiz_mode_answered,
+        on_click=submit_answer,
+        args=(q, pos),
+    )
+    if st.session_state.pop("quiz_mode_no_choice", False):
+        st.warning("Please select at least one answer before submitting.")
 
     if st.session_state.quiz_mode_answered:
         if st.session_state.quiz_mode_round_progress[pos]:
@@ -114,13 +223,21 @@ def show_quiz():
                 st.markdown(q.options[q.answer])
         st.markdown("### Explanation:")
         st.markdown(q.explanation, unsafe_allow_html=True)
+        if not st.session_state.quiz_mode_round_progress[pos]:
+            asked = set(question_ids[: pos + 1])
+            similar = [question_id for question_id, _ in related_questions(q.id, 5, exclude=asked)]
+            queued = bool(similar) and question_ids[pos + 1 : pos + 1 + len(similar)] == similar
+            st.button(
+                "🎯 Similar questions come next" if queued else f"🎯 Practice {len(similar)} similar questions",
+                key=f"similar_{pos}",
+                disabled=queued or not similar,
+                help="Questions closest in wording to this one, asked next in this round",
+                on_click=practice_similar,
+                args=(similar, pos),
+            )
 
     caption = "➡️ Next Question" if st.session_state.quiz_mode_answered else "⏭️ Skip Question"
-    if col2.button(caption, key=f"next_{pos}"):
-        st.session_state.quiz_mode_pos += 1
-        st.session_state.quiz_mode_answered = False
-        cache_session()
-        st.rerun()
+    col2.button(caption, key=f"next_{pos}", on_click=next_question, args=(q,))
 
     st.markdown("---")
     # small live round stats
@@ -132,26 +249,91 @@ def show_quiz():
         with st.popover("🔄 Restart Round"):
             st.warning("Restarting will lose current round progress. Are you sure?")
             if st.button("Yes, restart", type="primary"):
+                track_event("restart")
                 clear_round_data()
                 st.session_state.message = "Starting new round..."
-                start_new_round(quizzes)
-                st.rerun()
+                start_new_round(list(question_ids))
     with col2:
         with st.popover("🚫 Stop Round"):
             # show stats for current round
-            asked, correct, wrong, pct = compute_stats(st.session_state.quiz_mode_round_progress)
             st.info(f"Round stats — asked: {asked}, correct: {correct}, wrong: {wrong}, success: {pct:.1f}%")
 
-            progress = {
-                st.session_state.quizzes[p].id: res for p, res in st.session_state.quiz_mode_round_progress.items()
-            }
-            if st.button(
-                "Save round results to overall progress", icon="💾", on_click=save_progress_click, args=(progress,)
-            ):
-                st.switch_page("app.py")
+            if st.button("Save round results to overall progress", icon="💾", on_click=save_progress_click):
+                st.toast("Round results merged into overall progress.", icon="💾")
+                st.switch_page(DASHBOARD_PAGE)
 
             if st.button("Clear round data", icon="🗑️", on_click=clear_round_data):
-                st.switch_page("app.py")
+                st.switch_page(DASHBOARD_PAGE)
+
+
+def blueprint_inputs() -> Blueprint:
+    """Widgets for a round blueprint, prefilled with the bank's default one."""
+    saved = load_blueprint()
+    index = load_tag_index()
+    field = st.selectbox("Domains from", TAG_FIELDS, index=TAG_FIELDS.index(saved.field), key="blueprint_field")
+    counts = dict(index.fields[field].tags())
+    domains = st.multiselect(
+        "Domains",
+        list(counts),
+        default=[tag for tag in saved.shares if tag in counts] if field == saved.field else [],
+        format_func=lambda tag: f"{tag} ({counts[tag]} questions)",
+        key=f"blueprint_domains_{field}",
+    )
+    shares = {}
+    cols = st.columns(3)
+    for i, tag in enumerate(domains):
+        share = cols[i % 3].number_input(
+            f"{tag} (% of round)",
+            min_value=0,
+            max_value=100,
+            value=round(saved.shares.get(tag, 0.1) * 100),
+            step=5,
+            key=f"blueprint_share_{field}_{tag}",
+        )
+        shares[tag] = share / 100
+    if sum(shares.values()) > 1:
+        st.caption("The shares add up to more than 100% and are scaled down.")
+
+    product_counts = dict(index.fields[PRODUCT_FIELD].tags())
+    limited = st.multiselect(
+        "Products with limits",
+        list(product_counts),
+        default=sorted(p for p in saved.product_min.keys() | saved.product_max.keys() if p in product_counts),
+        format_func=lambda product: f"{product} ({product_counts[product]} questions)",
+        key="blueprint_products",
+    )
+    product_min, product_max = {}, {}
+    for product in limited:
+        col1, col2 = st.columns(2)
+        low = col1.number_input(
+            f"{product}: at least",
+            min_value=0,
+            value=saved.product_min.get(product),
+            placeholder="no minimum",
+            key=f"blueprint_min_{product}",
+        )
+        high = col2.number_input(
+            f"{product}: at most",
+            min_value=0,
+            value=saved.product_max.get(product),
+            placeholder="no maximum",
+            key=f"blueprint_max_{product}",
+        )
+        if low is not None:
+            product_min[product] = low
+        if high is not None:
+            product_max[product] = high
+
+    weakness = st.slider("Extra weight on weak domains", 0.0, 3.0, saved.weakness, step=0.25, key="blueprint_weakness")
+    return saved.model_copy(
+        update={
+            "field": field,
+            "shares": shares,
+            "product_min": product_min,
+            "product_max": product_max,
+            "weakness": weakness,
+        }
+    )
 
 
 def show_stats():
@@ -162,33 +344,31 @@ def show_stats():
         st.warning("No quizzes found in data/quizzes.jsonl")
         return
 
+    scheduler = load_scheduler()
+
     container = st.container()
     with container:
-        cols = st.columns(3)
+        cols = st.columns(4)
         with cols[0]:
             st.metric("Answered correctly", len(answered_correctly))
         with cols[1]:
             st.metric("Answered incorrectly", len(answered_incorrectly))
         with cols[2]:
             st.metric("Not answered", len(not_answered))
+        with cols[3]:
+            st.metric("Due for review", scheduler.count_due())
 
     if st.button("Start Round", type="primary"):
-        if st.session_state.wrong_answered_inclusion:
-            pct = st.session_state.correct_answered_percentage
-            num_to_include = int(len(answered_correctly) * pct / 100)
-            quizzes = not_answered + answered_incorrectly
-            if num_to_include > 0:
-                logger.info(f"Including {num_to_include} previously correct answered questions in the round.")
-                sampled_correct = random.sample(answered_correctly, num_to_include) if num_to_include > 0 else []
-                quizzes += sampled_correct
-        else:
-            quizzes = not_answered
-
-        if not quizzes:
+        question_ids = default_round_ids(
+            progress,
+            include_incorrect=st.session_state.wrong_answered_inclusion,
+            correct_pct=st.session_state.get("correct_answered_percentage", 0),
+        )
+        if not question_ids:
             st.warning("No quizzes left to answer for this round.")
         else:
             st.session_state.message = "Starting new round..."
-            start_new_round(quizzes)
+            start_new_round(question_ids)
 
     st.info("Press 'Start Round' to begin the quiz.")
 
@@ -204,13 +384,76 @@ def show_stats():
             key="correct_answered_percentage",
         )
 
+    with st.expander("📅 Due today (spaced repetition)"):
+        st.caption("Reviews questions whose spaced-repetition due date has passed, most overdue first.")
+        round_size = st.number_input("Questions in round", min_value=5, max_value=200, value=20, step=5)
+        fill_new = st.checkbox("Fill up with unanswered questions", value=True)
+        if st.button("Start Due Today Round"):
+            scheduled_ids = scheduler.due(round_size)
+            if fill_new and len(scheduled_ids) < round_size:
+                fill = random.sample(not_answered, min(len(not_answered), round_size - len(scheduled_ids)))
+                scheduled_ids += [q.id for q in fill]
+            if not scheduled_ids:
+                st.warning("Nothing is due for review today.")
+            else:
+                st.session_state.message = "Starting due today round..."
+                start_new_round(scheduled_ids, shuffle=False)
+
+    with st.expander("🔎 Round from search results"):
+        query = st.text_input("Search questions", placeholder="Keywords, e.g. feature store", key="search_round_query")
+        max_results = st.number_input("Max questions", min_value=1, max_value=200, value=20, step=5)
+        if query:
+            results = search_questions(query, limit=max_results)
+            st.caption(f"{len(results)} matching questions, best matches first.")
+            if st.button("Start Search Round", disabled=not results):
+                st.session_state.message = f"Starting round for '{query}'..."
+                start_new_round([question_id for question_id, _ in results], shuffle=False)
+
+    with st.expander("☁️ Round on a product"):
+        st.caption("Questions tagged with a product and, optionally, with its neighbors in the product graph.")
+        links = load_product_links()
+        counts = dict(links.products())
+        product = st.selectbox(
+            "Product",
+            list(counts),
+            format_func=lambda name: f"{name} ({counts[name]} questions)",
+            key="product_round_product",
+        )
+        depth = st.slider("Include graph neighbors up to depth", 0, 2, 0, key="product_round_depth")
+        if product:
+            product_ids = links.round_ids(product, depth)
+            st.caption(f"{len(product_ids)} questions in this round.")
+            if st.button("Start Product Round", disabled=not product_ids):
+                st.session_state.message = f"Starting round for {product}..."
+                start_new_round(product_ids)
+
+    with st.expander("⚖️ Blueprint round"):
+        st.caption(
+            "Questions drawn to a target mix of domains, with limits per product and more weight on "
+            "unanswered questions, wrong answers and weak domains. Questions outside the listed domains "
+            "fill the rest of the round."
+        )
+        blueprint = blueprint_inputs()
+        blueprint_size = st.number_input("Questions in round", min_value=5, max_value=200, value=60, step=5)
+        col1, col2 = st.columns(2)
+        if col1.button("Start Blueprint Round"):
+            blueprint_ids = blueprint_round_ids(blueprint_size, blueprint)
+            if not blueprint_ids:
+                st.warning("No questions match this blueprint.")
+            else:
+                st.session_state.message = "Starting blueprint round..."
+                start_new_round(blueprint_ids, shuffle=False)
+        if col2.button("Save as the bank's default", icon="💾"):
+            save_blueprint(blueprint)
+            st.toast("Blueprint saved.", icon="💾")
+
 
 def main():
     st.set_page_config(page_title="Quiz Mode")
 
     st.title("Quiz Mode")
 
-    if st.session_state.quiz_in_progress and st.session_state.quizzes:
+    if st.session_state.quiz_in_progress and st.session_state.quiz_round_ids:
         show_quiz()
     else:
         st.session_state.quiz_in_progress = None
@@ -1,30 +1,79 @@
 import logging
 from pathlib import Path
 
-import pandas as pd
 import streamlit as st
 
-from utils import set_css_style
+from utils import (
+    EditConflict,
+    load_question_bank,
+    related_questions,
+    save_question,
+    search_questions,
+    select_bank,
+    set_css_style,
+)
 from utils.session import load_session
 
+select_bank()
 load_session()
 
 
 st.session_state.setdefault("pos", 0)
 st.session_state.setdefault("is_editing", False)
 
-quizzies = pd.read_json("data/quizzes.jsonl", lines=True, orient="records")
-
 logger = logging.getLogger(__name__)
 
 set_css_style(Path("style.css"))
 
 
+def go_to(pos: int):
+    """Show the question at ``pos``; an edit in progress belongs to the question it started on and is dropped."""
+    st.session_state.pos = pos
+    st.session_state.is_editing = False
+    st.session_state.pop("edit_original", None)
+
+
+def show_search(bank):
+    query = st.text_input("🔎 Search questions", placeholder="Keywords, e.g. dataflow autoscal", key="edit_search")
+    if not query:
+        return
+    results = [question_id for question_id, _ in search_questions(query, limit=20) if question_id in bank.positions]
+    if not results:
+        st.info("No questions match your search.")
+        return
+    col1, col2 = st.columns([4, 1], vertical_alignment="bottom")
+    choice = col1.selectbox(
+        f"{len(results)} best matches",
+        results,
+        format_func=lambda question_id: f"#{question_id} — {bank.get(question_id).question[:120]}",
+        key="edit_search_choice",
+    )
+    if col2.button("Open", icon="📂"):
+        go_to(bank.positions[choice])
+        st.rerun()
+
+
+def show_related(bank, question_id: int):
+    related = [(other, score) for other, score in related_questions(question_id, 5) if other in bank.positions]
+    with st.expander(f"Related questions ({len(related)})"):
+        if not related:
+            st.caption("No question shares enough wording with this one.")
+        for other, score in related:
+            col1, col2 = st.columns([5, 1], vertical_alignment="center")
+            col1.markdown(f"**#{other}** (similarity {score:.2f}) — {bank.get(other).question[:160]}")
+            if col2.button("Open", icon="📂", key=f"related_{other}"):
+                go_to(bank.positions[other])
+                st.rerun()
+
+
 def main():
     st.set_page_config(page_title="Edit Questions Mode")
 
     st.title("View Gemini Results")
 
+    bank = load_question_bank()
+    quizzies = bank.questions
+
     pos = st.session_state.pos
 
     if pos < 0:
@@ -34,27 +83,35 @@ def main():
         st.session_state.pos = len(quizzies) - 1
         pos = len(quizzies) - 1
 
-    quizzy = quizzies.iloc[pos]
+    show_search(bank)
+
+    quizzy = quizzies[pos]
+    original = st.session_state.get("edit_original")
+    if original is not None and original.get("id") != quizzy.id:
+        # pos was changed elsewhere while editing
+        go_to(pos)
 
     col1, col2, col3 = st.columns([1, 2, 1])
     if col1.button("Previous", disabled=pos <= 0, type="primary", icon="⬅️"):
-        st.session_state.pos -= 1
+        go_to(pos - 1)
         st.rerun()
     if col2.button("Edit Current Question", type="secondary", icon="✏️"):
         st.session_state.is_editing = True
+        # remember what the editor started from to detect concurrent saves
+        st.session_state.edit_original = bank.record(quizzy.id)
         st.rerun()
     if (
         new_id := col2.number_input(
-            "Go to Question id:", min_value=1, max_value=quizzies.id.max(), value=quizzy.id, width=150
+            "Go to Question id:", min_value=1, max_value=max(bank.by_id), value=quizzy.id, width=150
         )
     ) != quizzy.id:
-        if new_id not in quizzies.id.values:
+        if new_id not in bank.positions:
             st.warning(f"Question id {new_id} does not exist.")
         else:
-            st.session_state.pos = quizzies[quizzies.id == new_id].index[0]
+            go_to(bank.positions[new_id])
             st.rerun()
     if col3.button("Next", disabled=pos >= len(quizzies) - 1, type="primary", icon="➡️"):
-        st.session_state.pos += 1
+        go_to(pos + 1)
         st.rerun()
 
     st.markdown(f"### Question (Id: {quizzy.id})  {pos + 1} / {len(quizzies)}")
@@ -96,19 +153,34 @@ def main():
         )
     else:
         st.markdown(quizzy.explanation, unsafe_allow_html=True)
+        show_related(bank, quizzy.id)
 
     if st.session_state.is_editing:
         col_save, col_cancel = st.columns(2)
         if col_save.button("💾 Save Changes", type="primary", key=f"save_{pos}"):
             new_answer = [i for i, val in enumerate(answers) if val]
-            quizzies.at[quizzy.name, "answer"] = new_answer if len(new_answer) > 1 else new_answer[0]
-            quizzies.at[quizzy.name, "explanation"] = explanation
-            quizzies.to_json("data/quizzes.jsonl", lines=True, orient="records")
-            st.session_state.is_editing = False
-            st.success("Changes saved successfully!")
-            st.rerun()
+            original = st.session_state.get("edit_original") or bank.record(quizzy.id)
+            if original.get("id") != quizzy.id:
+                st.error("This edit was started on another question. Cancel and edit this question again.")
+            elif not new_answer:
+                st.warning("Please select at least one correct answer.")
+            else:
+                record = {
+                    **original,
+                    "answer": new_answer if len(new_answer) > 1 else new_answer[0],
+                    "explanation": explanation,
+                }
+                try:
+                    save_question(record, original)
+                except EditConflict:
+                    st.error("This question was changed by someone else in the meantime. Cancel and edit it again.")
+                else:
+                    st.session_state.is_editing = False
+                    st.success("Changes saved successfully!")
+                    st.rerun()
         if col_cancel.button("❌ Cancel", type="secondary", key=f"cancel_{pos}"):
             st.session_state.is_editing = False
+            st.session_state.pop("edit_original", None)
             st.rerun()
 
 
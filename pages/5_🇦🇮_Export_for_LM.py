@@ -1,11 +1,17 @@
+import tempfile
+import zipfile
+from datetime import datetime, time
 from pathlib import Path
 
 import streamlit as st
 
-from utils import load_progress, load_quizzes
+from models.questions import TAG_FIELDS
+from utils import load_answer_history, load_progress, load_question_bank, select_bank
+from utils.export import FORMATS, STATES, select_questions, write_chunks, write_file
 
 MD_PATH = Path("export_for_lm.md")
 
+select_bank()
 
 # Read and display markdown content
 if MD_PATH.exists():
@@ -14,36 +20,65 @@ else:
     st.error(f"Markdown file '{MD_PATH.name}' not found.")
 
 
-# Export questions with "False" in Progress.json
-def export_false_questions():
+def selected_questions(states, tags, since):
+    """Selection of questions to export; reads the bank and progress of this session up front."""
+    questions = load_question_bank().questions
+    since_ts = datetime.combine(since, time.min).timestamp() if since else None
+    history = load_answer_history() if since_ts is not None else ()
     progress = load_progress()
-    questions, _, _ = load_quizzes(progress)
-
-    # Create markdown content
-    md_lines = [
-        "# Questions that I lack knowledge of\n",
-        "Below is a list of questions that I answered incorrectly. I should review these topics to improve my understanding.",
-        "Use all these questions as starting point to create flashcards and quizzes for me to study.",
-        "Use related knowledge to create additional questions to help me learn the topics better.\n",
-    ]
-    for q in questions:
-        md_lines.append(f"## Question ID: {q.id}\n")
-        md_lines.append(f"### Question: \n\n {q.question}\n")
-        md_lines.append("### Answer Options:")
-        md_lines.extend([f"- {answer}" for answer in q.options])
-        md_lines.append("\n### Correct Answer:\n")
-        if isinstance(q.answer, list):
-            md_lines.extend([f"- {q.options[a]}" for a in q.answer])
-        else:
-            md_lines.append(f"- {q.options[q.answer]}")
-
-        md_lines.append("---\n")
-
-    return "\n".join(md_lines)
-
-
-if st.button("Export Unanswered Questions for NotebookLM", type="primary"):
-    export_md = export_false_questions()
+    return lambda: select_questions(questions, progress, states, tags, since_ts, history)
+
+
+# Stream the export into files on disk rather than building it in memory
+def export_questions(directory: Path, questions, fmt, chunk_tokens=None) -> Path:
+    if not chunk_tokens:
+        path = directory / f"questions.{FORMATS[fmt].extension}"
+        write_file(path, fmt, questions)
+        return path
+    paths = write_chunks(directory / "chunks", fmt, questions, chunk_tokens)
+    path = directory / "questions.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for chunk in paths:
+            zf.write(chunk, chunk.name)
+    return path
+
+
+def export_data(selection, fmt, chunk_tokens=None):
+    """Deferred download: the file is only written when the download is clicked.
+
+    Streamlit serves downloads from memory, so the finished file is read back once there.
+    """
+
+    def build() -> bytes:
+        with tempfile.TemporaryDirectory() as tmp:
+            return export_questions(Path(tmp), selection(), fmt, chunk_tokens).read_bytes()
+
+    return build
+
+
+all_tags = sorted({t for q in load_question_bank().questions for field in TAG_FIELDS for t in getattr(q, field)})
+
+col1, col2 = st.columns(2)
+with col1:
+    states = st.multiselect(
+        "Questions", STATES, default=["incorrect"], format_func=lambda s: s.replace("_", " ").capitalize()
+    )
+    tags = st.multiselect("Only with tags", all_tags)
+with col2:
+    fmt = st.selectbox("Format", list(FORMATS), format_func=str.capitalize)
+    since = st.date_input("Answered since", value=None)
+chunked = st.toggle("Split into chunks for LLM context limits", value=False)
+chunk_tokens = None
+if chunked:
+    chunk_tokens = st.number_input("Tokens per chunk (approx.)", min_value=1000, value=32000, step=1000)
+
+if st.button("Export Questions for NotebookLM", type="primary", disabled=not states):
+    selection = selected_questions(states, tags, since)
+    name = "questions.zip" if chunk_tokens else f"questions.{FORMATS[fmt].extension}"
+    mime = "application/zip" if chunk_tokens else FORMATS[fmt].mime
     st.download_button(
-        label="Download Markdown", data=export_md, file_name="unanswered_questions.md", mime="text/markdown"
+        label=f"Download {name}",
+        data=export_data(selection, fmt, chunk_tokens),
+        file_name=name,
+        mime=mime,
     )
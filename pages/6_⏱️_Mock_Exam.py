@@ -0,0 +1,241 @@
+import math
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from models.questions import Question
+from utils import get_question, select_bank, set_css_style, show_html_frame
+from utils.api import exam_ids, grade_exam
+from utils.session import cache_exam, load_exam
+
+# the certification exam: 50-60 questions in two hours
+EXAM_SIZES = (50, 60)
+DURATION_MINUTES = 120
+PAGE_SIZES = (5, 10, 15, 20)
+
+select_bank()
+set_css_style(Path("style.css"))
+
+
+def start_exam(size: int, minutes: int, page_size: int, prefer_unanswered: bool):
+    now = time.time()
+    st.session_state.exam = {
+        "ids": exam_ids(size, prefer_unanswered),
+        "page": 0,
+        "page_size": page_size,
+        "answers": {},  # question id -> selected option indexes
+        "seconds": {},  # question id -> share of the time spent on its page
+        "started": now,
+        "deadline": now + minutes * 60,
+        "page_shown": now,
+        "result": None,
+    }
+    cache_exam()
+
+
+def page_ids(exam: dict) -> list[int]:
+    start = exam["page"] * exam["page_size"]
+    return exam["ids"][start : start + exam["page_size"]]
+
+
+def save_page(exam: dict, questions: list[Question]):
+    """Store the choices of the submitted form; widget values are in the session state by key."""
+    now = time.time()
+    share = (now - exam["page_shown"]) / max(1, len(questions))
+    for q in questions:
+        key = f"exam_{q.id}"
+        if q.mode == "single_choice":
+            choice = st.session_state.get(key)
+            selected = [] if choice is None else [choice]
+        else:
+            selected = [i for i in range(len(q.options)) if st.session_state.get(f"{key}_{i}")]
+        exam["answers"][q.id] = selected
+        exam["seconds"][q.id] = exam["seconds"].get(q.id, 0.0) + share
+    exam["page_shown"] = now
+
+
+def finish_exam(exam: dict):
+    """Grade the whole paper and record the answers in one write."""
+    now = time.time()
+    graded = grade_exam(exam["ids"], exam["answers"], exam["seconds"], ts=now)
+    if graded.results:
+        graded.save()
+    exam["result"] = {
+        "correct": {graded.question_ids[pos]: correct for pos, correct in graded.results.items()},
+        "finished": now,
+        "timed_out": now > exam["deadline"],
+    }
+
+
+def submit_page(questions: list[Question], move: int, finish: bool = False):
+    exam = st.session_state.exam
+    save_page(exam, questions)
+    if finish or time.time() > exam["deadline"]:
+        finish_exam(exam)
+    else:
+        exam["page"] += move
+    cache_exam()
+
+
+def clear_exam():
+    st.session_state.exam = None
+    cache_exam()
+
+
+def show_timer(deadline: float):
+    # counts down in the browser, so the page does not rerun every second
+    remaining = max(0, int(deadline - time.time()))
+    show_html_frame(
+        f"""
+<div id="timer" style="font-family: sans-serif; font-size: 1.1rem;"></div>
+<script>
+const end = Date.now() + {remaining} * 1000;
+function tick() {{
+    const left = Math.max(0, Math.round((end - Date.now()) / 1000));
+    const minutes = Math.floor(left / 60), seconds = String(left % 60).padStart(2, "0");
+    document.getElementById("timer").textContent = left ? `⏱️ ${{minutes}}:${{seconds}} left` : "⏱️ Time is up";
+    if (left) setTimeout(tick, 1000);
+}}
+tick();
+</script>
+""",
+        height=40,
+    )
+
+
+def question_input(q: Question, selected: list[int]):
+    key = f"exam_{q.id}"
+    if q.mode == "single_choice":
+        st.radio(
+            "Answer",
+            range(len(q.options)),
+            index=selected[0] if selected else None,
+            format_func=lambda i: q.options[i],
+            key=key,
+            label_visibility="collapsed",
+        )
+    else:
+        st.caption("Select all that apply.")
+        for i, option in enumerate(q.options):
+            st.checkbox(option, value=i in selected, key=f"{key}_{i}")
+
+
+def show_setup():
+    st.markdown(
+        "A timed paper in the format of the certification exam. Questions are shown a page at a time "
+        "and graded together when you finish; the results are added to your progress."
+    )
+    with st.form("exam_setup"):
+        size = st.radio("Questions", EXAM_SIZES, horizontal=True)
+        minutes = st.number_input("Time limit (minutes)", min_value=10, max_value=240, value=DURATION_MINUTES, step=10)
+        page_size = st.select_slider("Questions per page", PAGE_SIZES, value=10)
+        prefer_unanswered = st.checkbox("Prefer questions I have not answered yet")
+        if st.form_submit_button("Start exam", type="primary"):
+            start_exam(size, minutes, page_size, prefer_unanswered)
+            st.rerun()
+
+
+def show_exam(exam: dict):
+    ids = exam["ids"]
+    pages = math.ceil(len(ids) / exam["page_size"])
+    page = exam["page"]
+    show_timer(exam["deadline"])
+    answered = sum(1 for question_id in ids if exam["answers"].get(question_id))
+    st.progress(answered / len(ids), text=f"{answered} of {len(ids)} answered — page {page + 1} of {pages}")
+
+    first = page * exam["page_size"] + 1
+    questions = [q for q in map(get_question, page_ids(exam)) if q is not None]
+    with st.form(f"exam_page_{page}"):
+        for n, q in enumerate(questions, first):
+            st.markdown(f"**Question {n}**")
+            question = q.question if "<p>" in q.question.lower() else f"<p>{q.question}</p>"
+            st.markdown(question, unsafe_allow_html=True)
+            question_input(q, exam["answers"].get(q.id, []))
+            st.divider()
+        cols = st.columns(3)
+        cols[0].form_submit_button(
+            "⬅️ Previous page", disabled=page == 0, on_click=submit_page, args=(questions, -1)
+        )
+        cols[1].form_submit_button(
+            "Next page ➡️", type="primary", disabled=page == pages - 1, on_click=submit_page, args=(questions, 1)
+        )
+        cols[2].form_submit_button("🏁 Finish exam", on_click=submit_page, args=(questions, 0, True))
+
+
+def show_result(exam: dict):
+    result = exam["result"]
+    ids = exam["ids"]
+    correct = sum(result["correct"].values())
+    unanswered = len(ids) - len(result["correct"])
+    if result["timed_out"]:
+        st.warning("Time was up; the answers submitted until then were graded.")
+    cols = st.columns(4)
+    cols[0].metric("Score", f"{correct / len(ids):.0%}")
+    cols[1].metric("Correct", correct)
+    cols[2].metric("Wrong", len(result["correct"]) - correct)
+    cols[3].metric("Unanswered", unanswered)
+    minutes = (min(result["finished"], exam["deadline"]) - exam["started"]) / 60
+    st.caption(f"Time used: {minutes:.0f} of {(exam['deadline'] - exam['started']) / 60:.0f} minutes.")
+
+    questions = {question_id: get_question(question_id) for question_id in ids}
+    topics: dict[str, list[int]] = {}
+    for question_id, q in questions.items():
+        for topic in q.gcp_topics if q is not None else ():
+            stats = topics.setdefault(topic, [0, 0])
+            stats[0] += 1
+            stats[1] += int(result["correct"].get(question_id, False))
+    rows = [
+        {"topic": topic, "questions": total, "correct": right, "accuracy": right / total * 100}
+        for topic, (total, right) in topics.items()
+    ]
+    st.subheader("By topic")
+    st.dataframe(
+        sorted(rows, key=lambda row: (row["accuracy"], -row["questions"])),
+        hide_index=True,
+        column_config={"accuracy": st.column_config.ProgressColumn("accuracy", format="%.0f%%", max_value=100)},
+    )
+
+    st.subheader("Review")
+    for n, question_id in enumerate(ids, 1):
+        q = questions[question_id]
+        if q is None or result["correct"].get(question_id):
+            continue
+        selected = exam["answers"].get(question_id, [])
+        status = "unanswered" if question_id not in result["correct"] else "wrong"
+        with st.expander(f"Question {n} (#{q.id}) — {status}"):
+            st.markdown(q.question, unsafe_allow_html=True)
+            if selected:
+                st.markdown("**Your answer:** " + "; ".join(q.options[i] for i in selected))
+            answers = q.answer if isinstance(q.answer, list) else [q.answer]
+            st.markdown("**Correct answer:** " + "; ".join(q.options[i] for i in answers))
+            if q.explanation:
+                st.markdown(q.explanation, unsafe_allow_html=True)
+
+    st.button("Start a new exam", icon="📝", on_click=clear_exam)
+
+
+def main():
+    st.set_page_config(page_title="Mock Exam", layout="wide")
+
+    st.title("Mock Exam")
+
+    exam = load_exam()
+    if exam is not None and not exam["ids"]:
+        st.warning("There are no questions to put in an exam from this bank.")
+        st.button("Back", icon="⬅️", on_click=clear_exam)
+        st.stop()
+    if exam is None:
+        show_setup()
+    elif exam["result"] is not None:
+        show_result(exam)
+    elif time.time() > exam["deadline"]:
+        finish_exam(exam)
+        cache_exam()
+        show_result(exam)
+    else:
+        show_exam(exam)
+
+
+if __name__ == "__main__":
+    main()
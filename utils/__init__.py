@@ -1,59 +1,154 @@
-import json
 import logging
+import os
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
+from models.progress import AnswerEvent, TelemetryEvent
 from models.questions import Question
+from utils import aggregates, banks, scheduler
+from utils.progress_log import append_events, read_answer_history, read_progress, remove_progress
+from utils.repository import EditConflict, QuestionBank, file_version, get_bank, get_index, save_record
 
-DATA_DIR = Path("data")
-QUIZ_FILE = DATA_DIR / "quizzes.jsonl"
-PROGRESS_FILE = DATA_DIR / "progress.json"
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from utils import blueprint, irt, products, telemetry
+
+# the default question bank, plus one per data/banks/<name>/ (see utils.banks)
+DATA_DIR = Path(os.environ.get("QUIZ_DATA_DIR", Path(__file__).resolve().parent.parent / "data"))
+
+# "jsonl" (quizzes.jsonl + progress log) or "sqlite" (see utils.sqlite_store)
+STORAGE_BACKEND = os.environ.get("QUIZ_STORAGE", "jsonl")
+# database of the default bank; other banks keep a quiz.db in their directory
+DB_FILE = Path(os.environ["QUIZ_DB"]) if os.environ.get("QUIZ_DB") else None
+
+BANK_PARAM = "bank"
+# bank used outside a Streamlit session (CLI, scripts); sessions pick their own with select_bank
+default_bank = banks.DEFAULT_BANK
 
 logger = logging.getLogger(__name__)
 
 
+def use_sqlite() -> bool:
+    return STORAGE_BACKEND == "sqlite"
+
+
+def list_banks() -> dict[str, banks.Bank]:
+    return banks.discover(DATA_DIR, DB_FILE)
+
+
+def current_bank() -> banks.Bank:
+    """The bank selected in this browser session, or ``default_bank`` outside of Streamlit."""
+    available = list_banks()
+    in_session = get_script_run_ctx(suppress_warning=True) is not None
+    name = st.session_state.get("bank") if in_session else None
+    bank = available.get(name or default_bank) or next(iter(available.values()))
+    banks.touch(bank)
+    return bank
+
+
+def load_question_bank() -> QuestionBank:
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        return sqlite_store.get_bank(bank.db_file)
+    return get_bank(bank.quiz_file)
+
+
+def get_question(question_id: int) -> Question | None:
+    """Fetch one question by id without loading the whole bank."""
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        return sqlite_store.read_question(bank.db_file, question_id)
+    return get_index(bank.quiz_file).read(question_id)
+
+
+def save_question(record: dict, original: dict | None = None):
+    """Store one edited question record; raises ``EditConflict`` if it changed since ``original``."""
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        sqlite_store.save_record(bank.db_file, record, original)
+    else:
+        save_record(bank.quiz_file, record, original)
+
+
 def load_quizzes(progress: dict[int, bool]) -> tuple[list[Question], list[Question], list[Question]]:
     quizzes_answered_correctly: list[Question] = []
     quizzes_not_answered: list[Question] = []
     quizzes_answered_incorrectly: list[Question] = []
 
-    if not QUIZ_FILE.exists():
-        return quizzes_answered_incorrectly, quizzes_not_answered, quizzes_answered_correctly
-
-    with QUIZ_FILE.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            try:
-                question = Question.parse_raw(line)
-                if question.id in progress:
-                    if progress[question.id]:
-                        quizzes_answered_correctly.append(question)
-                    else:
-                        quizzes_answered_incorrectly.append(question)
-                else:
-                    quizzes_not_answered.append(question)
-            except Exception as e:
-                logger.error(f"Failed to parse question line: {e}")
-                continue
+    for question in load_question_bank().questions:
+        if question.id in progress:
+            if progress[question.id]:
+                quizzes_answered_correctly.append(question)
+            else:
+                quizzes_answered_incorrectly.append(question)
+        else:
+            quizzes_not_answered.append(question)
     return quizzes_answered_incorrectly, quizzes_not_answered, quizzes_answered_correctly
 
 
 def load_progress() -> dict[int, bool]:
-    if not PROGRESS_FILE.exists():
-        return {}
-    try:
-        with PROGRESS_FILE.open("r", encoding="utf-8") as f:
-            progress = json.load(f)
-        return {int(k): v for k, v in progress.items()}
-    except Exception:
-        return {}
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        return sqlite_store.load_progress(bank.db_file)
+    return read_progress(bank.progress_file, bank.progress_log)
+
+
+def progress_version() -> tuple:
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        return sqlite_store.progress_version(bank.db_file)
+    return file_version(bank.progress_file), file_version(bank.progress_log)
+
 
+def load_answer_history() -> list[AnswerEvent]:
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
 
-def save_progress(progress):
-    DATA_DIR.mkdir(exist_ok=True)
-    with PROGRESS_FILE.open("w", encoding="utf-8") as f:
-        json.dump(progress, f, ensure_ascii=False, indent=2)
+        return sqlite_store.read_history(bank.db_file)
+    return read_answer_history(bank.progress_file, bank.progress_log)
+
+
+def _progress_key() -> Path:
+    bank = current_bank()
+    return bank.db_file if use_sqlite() else bank.progress_log
+
+
+def load_scheduler() -> scheduler.Scheduler:
+    return scheduler.get_scheduler(_progress_key(), progress_version(), load_answer_history)
+
+
+def record_answers(events: list[AnswerEvent]):
+    """Append answer events to the progress log; cost is independent of the progress size."""
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        sqlite_store.record_answers(bank.db_file, events)
+    else:
+        append_events(bank.progress_file, bank.progress_log, events)
+        aggregates.record(load_question_bank(), bank.progress_file, bank.progress_log, events)
+    scheduler.record(_progress_key(), progress_version(), events)
+
+
+def save_progress(progress: dict[int, bool]):
+    now = time.time()
+    record_answers([AnswerEvent(id=k, correct=v, ts=now) for k, v in progress.items()])
 
 
 def compute_stats(round_progress):
@@ -65,13 +160,207 @@ def compute_stats(round_progress):
 
 
 def reset_progress():
-    if PROGRESS_FILE.exists():
-        PROGRESS_FILE.unlink()
+    bank = current_bank()
+    if use_sqlite():
+        from utils import sqlite_store
+
+        sqlite_store.reset_progress(bank.db_file)
+    else:
+        remove_progress(bank.progress_file, bank.progress_log)
+        aggregates.invalidate(bank.quiz_file)
+    scheduler.invalidate(_progress_key())
+
+
+def load_aggregates() -> aggregates.TagAggregates:
+    bank = current_bank()
+    return aggregates.get_aggregates(load_question_bank(), bank.progress_file, bank.progress_log)
+
+
+def compute_topic_distribution(topic_field: str = "gcp_topics") -> "pd.DataFrame":
+    """Number of questions per tag of ``topic_field``, most frequent first."""
+    if use_sqlite():
+        from utils import sqlite_store
+
+        return sqlite_store.topic_distribution(current_bank().db_file, topic_field)
+    return load_aggregates().distribution(topic_field)
+
+
+def compute_topic_stats(topic_field: str = "gcp_topics") -> "pd.DataFrame":
+    """Attempts, correct answers and accuracy per tag of ``topic_field`` over answered questions."""
+    if use_sqlite():
+        from utils import sqlite_store
+
+        return sqlite_store.topic_stats(current_bank().db_file, topic_field)
+    return load_aggregates().frame(topic_field)
+
+
+def search_questions(query: str, limit: int = 20) -> list[tuple[int, float]]:
+    """Question ids ranked by BM25 relevance to ``query`` (prefix matches included)."""
+    from utils.search import get_search_index
+
+    return get_search_index(load_question_bank()).search(query, limit)
+
+
+def related_questions(question_id: int, k: int = 5, exclude=()) -> list[tuple[int, float]]:
+    """Ids of the ``k`` questions most similar in wording to ``question_id``, with their similarity."""
+    from utils.related import get_related_index
+
+    return get_related_index(load_question_bank()).related(question_id, k, exclude)
+
+
+def load_tag_index() -> "blueprint.TagIndex":
+    from utils import blueprint
+
+    return blueprint.get_tag_index(load_question_bank())
+
+
+def load_blueprint() -> "blueprint.Blueprint":
+    """The default round blueprint of the current bank (its ``blueprint.json``)."""
+    from utils import blueprint
+
+    return blueprint.get_blueprint(current_bank().blueprint_file)
+
+
+def save_blueprint(value: "blueprint.Blueprint"):
+    from utils import blueprint
+
+    blueprint.write_blueprint(current_bank().blueprint_file, value)
+
+
+def load_calibration() -> "irt.Calibration | None":
+    """Question difficulties fitted from many learners (see ``utils.irt``), if the bank has them."""
+    from utils import irt
+
+    return irt.get_calibration(current_bank().calibration_file)
+
+
+def compute_ability() -> tuple[float, float] | None:
+    """This learner's ability estimate and its standard error, if the bank is calibrated."""
+    calibration = load_calibration()
+    if calibration is None:
+        return None
+    return calibration.ability(load_progress, progress_version())
+
+
+def compute_readiness() -> dict | None:
+    """Ability, expected exam score and pass probability of this learner, if the bank is calibrated."""
+    calibration = load_calibration()
+    if calibration is None:
+        return None
+    return calibration.readiness(*calibration.ability(load_progress, progress_version()))
+
+
+def track(event: TelemetryEvent):
+    """Buffer a Quiz Mode telemetry event; it is written later in a batch."""
+    from utils import telemetry
+
+    telemetry.get_buffer(current_bank().telemetry_file).emit(event)
+
+
+def load_telemetry_summary() -> "telemetry.TelemetrySummary":
+    from utils import telemetry
+
+    bank = current_bank()
+    telemetry.get_buffer(bank.telemetry_file).flush()
+    return telemetry.get_summary(bank.telemetry_file)
+
+
+def load_product_graph() -> "products.ProductGraph":
+    from utils import products
+
+    return products.get_product_graph(current_bank().products_file)
+
+
+def load_product_links() -> "products.QuestionLinks":
+    from utils import products
+
+    return products.get_question_links(current_bank().products_file, load_question_bank())
+
+
+def compute_product_accuracy() -> "pd.DataFrame":
+    """Questions, answered, correct and accuracy (%) per product, from the current progress."""
+    return load_product_links().accuracy(load_progress(), progress_version())
+
+
+def product_graph_html(selected: str | None = None, depth: int = 1) -> str:
+    from utils import products
+
+    return products.graph_html(current_bank().products_file, selected, depth)
+
+
+# per-page state that refers to the questions of one bank, dropped when switching banks
+BANK_STATE_KEYS = (
+    "quiz_in_progress",
+    "quiz_round_ids",
+    "quiz_mode_pos",
+    "quiz_mode_round_progress",
+    "quiz_mode_round_answers",
+    "quiz_mode_answered",
+    "quiz_mode_shown",
+    "product_round_product",
+    "blueprint_field",
+    "blueprint_products",
+    "pos",
+    "is_editing",
+    "edit_original",
+    "exam",
+)
+
+
+def _switch_bank():
+    st.session_state.bank = st.session_state.bank_select
+    for key in BANK_STATE_KEYS:
+        st.session_state.pop(key, None)
+
+
+def select_bank() -> banks.Bank:
+    """Sidebar picker of the question bank of this session, shown when there is more than one.
+
+    The choice is mirrored in the URL, so a reload stays on the same bank; each bank is only
+    loaded once a session selects it.
+    """
+    available = list_banks()
+    if st.session_state.get("bank") not in available:
+        requested = st.query_params.get(BANK_PARAM)
+        st.session_state.bank = requested if requested in available else next(iter(available))
+    if len(available) > 1:
+        names = list(available)
+        st.sidebar.selectbox(
+            "Question bank",
+            names,
+            index=names.index(st.session_state.bank),
+            format_func=lambda name: available[name].title,
+            key="bank_select",
+            on_change=_switch_bank,
+        )
+        if st.query_params.get(BANK_PARAM) != st.session_state.bank:
+            st.query_params[BANK_PARAM] = st.session_state.bank
+    return current_bank()
+
+
+def show_html_frame(body: str, height: int):
+    """Show an HTML document with its scripts in an iframe of ``height`` pixels.
+
+    ``st.iframe`` replaces ``components.v1.html``, which is deprecated where it exists;
+    older Streamlit versions only have the latter.
+    """
+    if hasattr(st, "iframe"):
+        st.iframe(body, height=height)
+    else:
+        import streamlit.components.v1 as components
+
+        components.html(body, height=height)
+
+
+_css: dict[Path, tuple[tuple, str]] = {}
 
 
 def set_css_style(css_path: Path):
-    if not css_path.exists():
+    version = file_version(css_path)
+    if version is None:
         return
-    with css_path.open("r", encoding="utf-8") as f:
-        css = f.read()
-    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    cached = _css.get(css_path)
+    if cached is None or cached[0] != version:
+        with css_path.open("r", encoding="utf-8") as f:
+            cached = _css[css_path] = (version, f.read())
+    st.markdown(f"<style>{cached[1]}</style>", unsafe_allow_html=True)
@@ -0,0 +1,119 @@
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from models.progress import AnswerEvent
+from models.questions import TAG_FIELDS
+from utils.progress_log import read_history, read_snapshot
+from utils.repository import QuestionBank, file_version
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class TagAggregates:
+    """Per-tag question counts and answer stats, built once and updated as answers arrive.
+
+    For every tag of every field it keeps ``[questions, attempts, correct, last_seen]``,
+    where attempts/correct count answered questions by their latest result (like
+    ``progress.json``), so the dashboard only has to filter and sort a small table.
+    """
+
+    def __init__(self, bank: QuestionBank, progress: dict[int, bool], last_seen: dict[int, float]):
+        self.bank_version = bank.version
+        self.progress: dict[int, bool] = {}
+        self.question_tags = {
+            field: {q.id: getattr(q, field) for q in bank.questions} for field in TAG_FIELDS
+        }
+        self.stats: dict[str, dict[str, list]] = {field: {} for field in TAG_FIELDS}
+        for field, tags_by_question in self.question_tags.items():
+            for tags in tags_by_question.values():
+                for tag in tags:
+                    self.stats[field].setdefault(tag, [0, 0, 0, None])[0] += 1
+        self._frames: dict[str, "pd.DataFrame"] = {}
+        self._lock = threading.Lock()
+        for question_id, correct in progress.items():
+            self._apply(question_id, correct, last_seen.get(question_id))
+
+    def _apply(self, question_id: int, correct: bool, ts: float | None):
+        old = self.progress.get(question_id)
+        self.progress[question_id] = correct
+        for field, tags_by_question in self.question_tags.items():
+            for tag in tags_by_question.get(question_id, ()):
+                stats = self.stats[field][tag]
+                if old is None:
+                    stats[1] += 1
+                stats[2] += int(correct) - int(bool(old))
+                if ts is not None and (stats[3] is None or ts > stats[3]):
+                    stats[3] = ts
+
+    def apply(self, events: Iterable[AnswerEvent]):
+        with self._lock:
+            for event in events:
+                self._apply(event.id, event.correct, event.ts)
+            self._frames.clear()
+
+    def distribution(self, field: str) -> "pd.DataFrame":
+        """Number of questions per tag, most frequent first."""
+        import pandas as pd
+
+        with self._lock:
+            rows = [(tag, stats[0]) for tag, stats in self.stats[field].items()]
+        df = pd.DataFrame(rows, columns=["topic", "count"])
+        return df.sort_values("count", ascending=False, kind="stable").reset_index(drop=True)
+
+    def frame(self, field: str) -> "pd.DataFrame":
+        """Attempts, correct answers, accuracy and last answer time per answered tag."""
+        import pandas as pd
+
+        with self._lock:
+            if field not in self._frames:
+                rows = [(tag, *stats[1:]) for tag, stats in self.stats[field].items() if stats[1] > 0]
+                df = pd.DataFrame(rows, columns=["topic", "attempts", "correct", "last_seen"])
+                df["accuracy"] = df["correct"] / df["attempts"]
+                self._frames[field] = df
+            return self._frames[field].copy()
+
+
+_aggregates: dict[Path, tuple[tuple, TagAggregates]] = {}
+_lock = threading.Lock()
+
+
+def _progress_version(snapshot_file: Path, log_file: Path) -> tuple:
+    return file_version(snapshot_file), file_version(log_file)
+
+
+def get_aggregates(bank: QuestionBank, snapshot_file: Path, log_file: Path) -> TagAggregates:
+    """Shared aggregates of ``bank``; rebuilt when the bank or the progress files change behind our back."""
+    version = _progress_version(snapshot_file, log_file)
+    with _lock:
+        cached = _aggregates.get(bank.path)
+        if cached is not None and cached[0] == version and cached[1].bank_version == bank.version:
+            return cached[1]
+        progress = read_snapshot(snapshot_file)
+        last_seen: dict[int, float] = {}
+        for event in read_history(log_file):
+            last_seen[event.id] = event.ts
+            progress[event.id] = event.correct
+        aggregates = TagAggregates(bank, progress, last_seen)
+        _aggregates[bank.path] = (version, aggregates)
+        return aggregates
+
+
+def record(bank: QuestionBank, snapshot_file: Path, log_file: Path, events: list[AnswerEvent]):
+    """Fold answers this process just appended into the cached aggregates, if there are any."""
+    with _lock:
+        cached = _aggregates.get(bank.path)
+        if cached is None or cached[1].bank_version != bank.version:
+            return
+        cached[1].apply(events)
+        _aggregates[bank.path] = (_progress_version(snapshot_file, log_file), cached[1])
+
+
+def invalidate(path: Path | None = None):
+    with _lock:
+        if path is None:
+            _aggregates.clear()
+        else:
+            _aggregates.pop(path, None)
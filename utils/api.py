@@ -0,0 +1,373 @@
+"""Headless access to rounds, grading, progress and reports, without Streamlit.
+
+Everything here works on the storage configured in ``utils`` (see ``use_data_dir`` and
+``use_bank``) and is what ``utils.cli`` and the pages build on::
+
+    from utils import api
+
+    quiz = api.start_round(size=10)
+    while not quiz.done:
+        quiz.answer([0])
+    quiz.save()
+"""
+
+import logging
+import math
+import random
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import utils
+from models.progress import AnswerEvent
+from models.questions import Question
+from utils import banks
+from utils.progress_log import history_dir, read_history, read_snapshot
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from utils.blueprint import Blueprint
+    from utils.irt import Calibration
+    from utils.validation import ValidationReport
+
+logger = logging.getLogger(__name__)
+
+
+def use_data_dir(data_dir: Path):
+    """Point the app at the question banks (and their progress) under ``data_dir``."""
+    utils.DATA_DIR = data_dir
+    utils.default_bank = banks.DEFAULT_BANK
+
+
+def use_bank(name: str):
+    """Work on the bank ``name`` from now on (outside of Streamlit sessions)."""
+    available = utils.list_banks()
+    if name not in available:
+        raise ValueError(f"unknown question bank {name!r}, available: {', '.join(available)}")
+    utils.default_bank = name
+
+
+def grade(question: Question, choice: list[int]) -> bool:
+    """Whether the selected option indexes are exactly the correct answer."""
+    if question.mode == "multiple_choice" or isinstance(question.answer, list):
+        answers = question.answer if isinstance(question.answer, list) else [question.answer]
+        return set(choice) == set(answers)
+    return len(choice) == 1 and choice[0] == question.answer
+
+
+def default_round_ids(
+    progress: dict[int, bool],
+    include_incorrect: bool = False,
+    correct_pct: int = 0,
+    rng: random.Random | None = None,
+) -> list[int]:
+    """Unanswered questions, optionally plus wrong ones and a share of the correct ones."""
+    rng = rng or random.Random()
+    incorrect, not_answered, correct = utils.load_quizzes(progress)
+    questions = list(not_answered)
+    if include_incorrect:
+        questions += incorrect
+        num_to_include = int(len(correct) * correct_pct / 100)
+        if num_to_include > 0:
+            logger.info(f"Including {num_to_include} previously correct answered questions in the round.")
+            questions += rng.sample(correct, num_to_include)
+    return [q.id for q in questions]
+
+
+def blueprint_round_ids(size: int = 60, blueprint: "Blueprint | None" = None, seed: int | None = None) -> list[int]:
+    """A shuffled round drawn to ``blueprint`` (default: the bank's ``blueprint.json``), see ``utils.blueprint``."""
+    import numpy as np
+
+    from utils.blueprint import build_round
+
+    blueprint = blueprint or utils.load_blueprint()
+    index = utils.load_tag_index()
+    rng = np.random.default_rng(seed)
+    return build_round(index, blueprint, utils.load_progress, size, rng, utils.progress_version())
+
+
+class QuizRound:
+    """A round of questions answered in order, like a Quiz Mode session."""
+
+    def __init__(self, question_ids: list[int]):
+        self.question_ids = question_ids
+        self.pos = 0
+        self.results: dict[int, bool] = {}
+        self.answers: dict[int, dict] = {}
+        self._shown = time.time()
+
+    @property
+    def done(self) -> bool:
+        return self.pos >= len(self.question_ids)
+
+    def current(self) -> Question | None:
+        """The question at the current position; questions deleted since the round started are skipped."""
+        while not self.done:
+            question = utils.get_question(self.question_ids[self.pos])
+            if question is not None:
+                return question
+            self.pos += 1
+        return None
+
+    def answer(self, choice: list[int], ts: float | None = None, elapsed: float | None = None) -> bool:
+        """Grade ``choice`` for the current question; ``elapsed`` defaults to the time since it was shown."""
+        question = self.current()
+        if question is None:
+            raise IndexError("the round is complete")
+        ts = time.time() if ts is None else ts
+        correct = grade(question, choice)
+        self.results[self.pos] = correct
+        elapsed = max(0.0, ts - self._shown) if elapsed is None else elapsed
+        self.answers[self.pos] = {"choice": list(choice), "ts": ts, "elapsed": elapsed}
+        self._advance()
+        return correct
+
+    def skip(self):
+        if self.current() is not None:
+            self._advance()
+
+    def _advance(self):
+        self.pos += 1
+        self._shown = time.time()
+
+    def events(self) -> list[AnswerEvent]:
+        return [
+            AnswerEvent(id=self.question_ids[pos], correct=correct, **self.answers[pos])
+            for pos, correct in self.results.items()
+        ]
+
+    def stats(self) -> tuple[int, int, int, float]:
+        """Asked, correct, wrong and success percentage so far."""
+        return utils.compute_stats(self.results)
+
+    def save(self):
+        """Merge the answers into the overall progress."""
+        utils.record_answers(self.events())
+
+
+def start_round(
+    kind: str = "new",
+    size: int | None = None,
+    include_incorrect: bool = False,
+    correct_pct: int = 0,
+    query: str | None = None,
+    product: str | None = None,
+    depth: int = 0,
+    seed: int | None = None,
+    blueprint: "Blueprint | None" = None,
+) -> QuizRound:
+    """Build a round the way Quiz Mode does.
+
+    ``kind`` is ``new`` (unanswered, optionally with wrong/correct ones; shuffled),
+    ``due`` (spaced-repetition reviews, most overdue first), ``search`` (best matches
+    for ``query``), ``product`` (questions on ``product`` and its graph neighbors) or
+    ``blueprint`` (drawn to ``blueprint``, by default the bank's, see ``blueprint_round_ids``).
+    """
+    rng = random.Random(seed)
+    if kind == "new":
+        question_ids = default_round_ids(utils.load_progress(), include_incorrect, correct_pct, rng)
+        rng.shuffle(question_ids)
+    elif kind == "due":
+        question_ids = utils.load_scheduler().due(size or 20)
+    elif kind == "search":
+        if not query:
+            raise ValueError("a search round needs a query")
+        question_ids = [question_id for question_id, _ in utils.search_questions(query, limit=size or 20)]
+    elif kind == "product":
+        if not product:
+            raise ValueError("a product round needs a product")
+        question_ids = utils.load_product_links().round_ids(product, depth)
+        rng.shuffle(question_ids)
+    elif kind == "blueprint":
+        question_ids = blueprint_round_ids(size or 60, blueprint, seed)
+    else:
+        raise ValueError(f"unknown round kind {kind!r}")
+    return QuizRound(question_ids[:size] if size else question_ids)
+
+
+def exam_ids(size: int, prefer_unanswered: bool = False, rng: random.Random | None = None) -> list[int]:
+    """A mock exam paper of ``size`` questions drawn at random from the bank.
+
+    With ``prefer_unanswered`` questions not answered yet are drawn first, then wrong ones,
+    then the rest.
+    """
+    rng = rng or random.Random()
+    incorrect, not_answered, correct = utils.load_quizzes(utils.load_progress())
+    if not prefer_unanswered:
+        pool = [q.id for q in (*incorrect, *not_answered, *correct)]
+        return rng.sample(pool, min(size, len(pool)))
+    paper: list[int] = []
+    for group in (not_answered, incorrect, correct):
+        ids = [q.id for q in group]
+        paper += rng.sample(ids, min(size - len(paper), len(ids)))
+    rng.shuffle(paper)
+    return paper
+
+
+def grade_exam(
+    question_ids: list[int],
+    answers: dict[int, list[int]],
+    seconds: dict[int, float] | None = None,
+    ts: float | None = None,
+) -> QuizRound:
+    """Grade a whole paper at once; questions without an answer are left out of the round.
+
+    ``seconds`` is the time spent per question, if known. The returned round holds the
+    graded answers; ``save()`` records them in one write.
+    """
+    ts = time.time() if ts is None else ts
+    seconds = seconds or {}
+    exam = QuizRound([question_id for question_id in question_ids if answers.get(question_id)])
+    while (q := exam.current()) is not None:
+        exam.answer(answers[q.id], ts, seconds.get(q.id))
+    return exam
+
+
+def read_progress_file(path: Path) -> list[AnswerEvent]:
+    """Answer events from a ``progress.json`` snapshot or a ``.jsonl`` event log.
+
+    A log is read with the segments compacted into its history directory. Snapshot
+    entries carry no timestamps and are dated with the file's mtime.
+    """
+    if path.suffix == ".jsonl":
+        return list(read_history(path))
+    ts = path.stat().st_mtime
+    return [AnswerEvent(id=k, correct=v, ts=ts) for k, v in read_snapshot(path).items()]
+
+
+def latest_answers(paths: Iterable[Path]) -> dict[int, AnswerEvent]:
+    """The latest answer per question over several progress files."""
+    latest: dict[int, AnswerEvent] = {}
+    for path in paths:
+        for event in read_progress_file(path):
+            if event.id not in latest or event.ts >= latest[event.id].ts:
+                latest[event.id] = event
+    return latest
+
+
+def merge_progress(paths: Iterable[Path], record: bool = True) -> dict[int, bool]:
+    """Add the answers of several progress files to the current progress, latest answer per question winning.
+
+    Answers no newer than the one already stored for their question are left out: the
+    progress is replayed in the order answers were recorded, so appending a stale answer
+    would override a newer one. Returns the answers merged, or with ``record=False`` the
+    ones that would be.
+    """
+    stored: dict[int, float] = {}
+    for event in utils.load_answer_history():
+        stored[event.id] = max(event.ts, stored.get(event.id, event.ts))
+    events = sorted(
+        (event for event in latest_answers(paths).values() if event.ts > stored.get(event.id, -math.inf)),
+        key=lambda event: event.ts,
+    )
+    if record and events:
+        utils.record_answers(events)
+    return {event.id: event.correct for event in events}
+
+
+# .jsonl files found next to progress that hold no answers
+NOT_PROGRESS_FILES = ("quizzes.jsonl", "telemetry.jsonl", "gcp_products.jsonl")
+
+
+def is_progress_file(path: Path) -> bool:
+    if path.name == "progress.json":
+        return True
+    return (
+        path.suffix == ".jsonl"
+        and path.name not in NOT_PROGRESS_FILES
+        and not path.name.endswith(".edits.jsonl")
+        # compacted segments are read with their log
+        and not path.parent.name.endswith(".history")
+    )
+
+
+def cohort_files(directory: Path) -> dict[str, list[Path]]:
+    """Progress files of every learner under ``directory``, by name.
+
+    The ``progress.json`` and ``progress.log.jsonl`` of one directory are one learner
+    (named after the directory); any other ``.jsonl`` answer log is a learner of its own.
+    Question files, edit journals and telemetry are skipped.
+    """
+    files: dict[str, list[Path]] = {}
+    for path in sorted(p for p in directory.rglob("*") if p.is_file() and is_progress_file(p)):
+        owner = path.parent if path.name in ("progress.json", "progress.log.jsonl") else path
+        files.setdefault(str(owner.relative_to(directory)), []).append(path)
+    # a log compacted away leaves only its snapshot and history directory
+    for paths in files.values():
+        log = paths[0].with_name("progress.log.jsonl")
+        if paths[0].name == "progress.json" and log not in paths and history_dir(log).is_dir():
+            paths.append(log)
+    return files
+
+
+def cohort_progress(directory: Path) -> dict[str, dict[int, bool]]:
+    """Progress of every learner under ``directory``, by name (see ``cohort_files``)."""
+    files = cohort_files(directory)
+    return {
+        name: {question_id: event.correct for question_id, event in latest_answers(paths).items()}
+        for name, paths in files.items()
+    }
+
+
+def calibrate(
+    cohort: Path, include_own: bool = False, max_iterations: int | None = None, output: Path | None = None
+) -> "Calibration":
+    """Fit question difficulties from the learners under ``cohort`` and store them with the bank (see ``utils.irt``)."""
+    from utils import irt
+
+    bank = utils.load_question_bank()
+    progress = cohort_progress(cohort)
+    if include_own:
+        progress["(this deployment)"] = utils.load_progress()
+    progress = {name: {k: v for k, v in answers.items() if k in bank.by_id} for name, answers in progress.items()}
+    progress = {name: answers for name, answers in progress.items() if answers}
+    if not progress:
+        raise ValueError(f"no answers to questions of this bank under {cohort}")
+    calibration = irt.fit(irt.Responses(progress), max_iterations or irt.MAX_ITERATIONS)
+    irt.write_calibration(output or utils.current_bank().calibration_file, calibration)
+    return calibration
+
+
+def knowledge_gaps(field: str = "gcp_topics", min_attempts: int = 1) -> "pd.DataFrame":
+    """Tags of ``field`` with their accuracy, weakest first."""
+    df = utils.compute_topic_stats(field)
+    df = df[df["attempts"] >= min_attempts]
+    return df.sort_values(["accuracy", "attempts"], ascending=[True, False]).reset_index(drop=True)
+
+
+def product_gaps(min_answered: int = 1) -> "pd.DataFrame":
+    """Catalog products with the accuracy of their linked questions, weakest first."""
+    df = utils.compute_product_accuracy()
+    df = df[df["is_product"] & (df["answered"] >= min_answered)].drop(columns="is_product")
+    return df.sort_values(["accuracy", "answered"], ascending=[True, False]).reset_index(drop=True)
+
+
+def progress_report(events: list[AnswerEvent], field: str = "gcp_topics") -> dict:
+    """Stats and weakest tags of one learner's answers, without touching the progress store."""
+    progress: dict[int, bool] = {}
+    last_seen: dict[int, float] = {}
+    for event in sorted(events, key=lambda e: e.ts):
+        progress[event.id] = event.correct
+        last_seen[event.id] = event.ts
+    bank = utils.load_question_bank()
+    aggregates = utils.aggregates.TagAggregates(bank, {k: v for k, v in progress.items() if k in bank.by_id}, last_seen)
+    gaps = aggregates.frame(field).sort_values("accuracy").head(5)
+    asked, correct, wrong, pct = utils.compute_stats(progress)
+    return {
+        "answered": asked,
+        "correct": correct,
+        "wrong": wrong,
+        "accuracy": pct,
+        "unanswered": len(bank) - len(progress.keys() & bank.by_id.keys()),
+        "weakest": gaps[["topic", "attempts", "accuracy"]].to_dict(orient="records"),
+    }
+
+
+def validate_bank(path: Path | None = None, threshold: float | None = None) -> "ValidationReport":
+    """Structural problems and near-duplicate questions of a question file (see ``utils.validation``)."""
+    from utils import validation
+
+    return validation.validate(path or utils.current_bank().quiz_file, threshold or validation.THRESHOLD)
+
@@ -0,0 +1,139 @@
+"""Question banks of one deployment, discovered from the data directory.
+
+The data directory itself holds the default bank (``quizzes.jsonl`` and its progress
+files, as before); every ``banks/<name>/quizzes.jsonl`` below it is another bank with
+the same layout, so progress, edits and search indexes are kept per bank.
+An optional ``bank.json`` next to the questions sets the bank's ``title``, and an optional
+``blueprint.json`` its default round blueprint (see ``utils.blueprint``). Banks without
+their own ``gcp_products.jsonl`` share the catalog of the data directory.
+
+Nothing is loaded until a bank is used; ``touch`` marks a bank as in use and drops the
+in-memory caches of banks nobody has used for ``IDLE_SECONDS``.
+"""
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from utils import aggregates, repository, scheduler, search
+
+logger = logging.getLogger(__name__)
+
+BANKS_DIR = "banks"
+DEFAULT_BANK = "default"
+IDLE_SECONDS = 30 * 60
+EVICT_INTERVAL = 60.0  # seconds between checks for idle banks
+
+
+class Bank:
+    def __init__(self, name: str, data_dir: Path, shared_dir: Path | None = None, db_file: Path | None = None):
+        self.name = name
+        self.data_dir = data_dir
+        self.quiz_file = data_dir / "quizzes.jsonl"
+        self.progress_file = data_dir / "progress.json"
+        self.progress_log = data_dir / "progress.log.jsonl"
+        self.telemetry_file = data_dir / "telemetry.jsonl"
+        self.db_file = db_file or data_dir / "quiz.db"
+        self.products_file = data_dir / "gcp_products.jsonl"
+        self.blueprint_file = data_dir / "blueprint.json"
+        self.calibration_file = data_dir / "calibration.json"
+        if shared_dir is not None and not self.products_file.exists():
+            self.products_file = shared_dir / "gcp_products.jsonl"
+        self.title = name.upper() if name != DEFAULT_BANK else "Default"
+        meta = data_dir / "bank.json"
+        if meta.exists():
+            try:
+                self.title = json.loads(meta.read_text(encoding="utf-8")).get("title", self.title)
+            except ValueError as e:
+                logger.warning(f"Ignoring invalid {meta}: {e}")
+
+    def __repr__(self):
+        return f"Bank({self.name!r}, {str(self.data_dir)!r})"
+
+
+_discovered: dict[Path, tuple[tuple, dict[str, Bank]]] = {}
+_last_used: dict[Path, tuple[float, Bank]] = {}
+_last_eviction = 0.0
+_lock = threading.Lock()
+
+
+def _has_questions(bank: Bank) -> bool:
+    return bank.quiz_file.exists() or bank.db_file.exists()
+
+
+def discover(data_dir: Path, db_file: Path | None = None) -> dict[str, Bank]:
+    """Banks under ``data_dir`` by name, the default bank first; rescanned when a bank is added.
+
+    ``db_file`` overrides the SQLite database of the default bank.
+    """
+    banks_dir = data_dir / BANKS_DIR
+    version = (
+        repository.file_version(data_dir / "quizzes.jsonl"),
+        repository.file_version(db_file or data_dir / "quiz.db"),
+        repository.file_version(banks_dir),
+    )
+    with _lock:
+        cached = _discovered.get(data_dir)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    others = {}
+    if banks_dir.is_dir():
+        for path in sorted(p for p in banks_dir.iterdir() if p.is_dir() and p.name != DEFAULT_BANK):
+            bank = Bank(path.name, path, shared_dir=data_dir)
+            if _has_questions(bank):
+                others[bank.name] = bank
+    default = Bank(DEFAULT_BANK, data_dir, db_file=db_file)
+    # without any banks the default one stays, empty, as the app always had it
+    banks = {DEFAULT_BANK: default} if _has_questions(default) or not others else {}
+    banks.update(others)
+    with _lock:
+        _discovered[data_dir] = (version, banks)
+    return banks
+
+
+def touch(bank: Bank, now: float | None = None):
+    """Mark ``bank`` as in use and, at most every ``EVICT_INTERVAL``, evict idle banks."""
+    global _last_eviction
+
+    now = time.monotonic() if now is None else now
+    with _lock:
+        _last_used[bank.data_dir] = (now, bank)
+        due = now - _last_eviction >= EVICT_INTERVAL
+        if due:
+            _last_eviction = now
+    if due:
+        evict_idle(now)
+
+
+def evict_idle(now: float | None = None, max_idle: float = IDLE_SECONDS) -> list[Bank]:
+    """Drop the cached questions, indexes, aggregates and schedulers of banks idle for ``max_idle``."""
+    now = time.monotonic() if now is None else now
+    with _lock:
+        idle = [bank for used, bank in _last_used.values() if now - used >= max_idle]
+        for bank in idle:
+            del _last_used[bank.data_dir]
+    for bank in idle:
+        release(bank)
+        logger.info(f"Evicted idle question bank {bank.name}")
+    return idle
+
+
+def release(bank: Bank):
+    """Forget everything cached in memory for ``bank``; it is reloaded on next use."""
+    from utils import blueprint, irt, products, related, sqlite_store
+
+    repository.invalidate(bank.quiz_file)
+    aggregates.invalidate(bank.quiz_file)
+    sqlite_store.invalidate(bank.db_file)
+    # the bank's path is its question file, or its database with the SQLite storage
+    for path in (bank.quiz_file, bank.db_file):
+        search.invalidate(path)
+        products.invalidate(path)
+        blueprint.invalidate(path)
+        related.invalidate(path)
+    blueprint.invalidate(bank.blueprint_file)
+    irt.invalidate(bank.calibration_file)
+    scheduler.invalidate(bank.progress_log)
+    scheduler.invalidate(bank.db_file)
@@ -0,0 +1,357 @@
+"""Rounds drawn to a blueprint: a target mix of exam domains, product limits and extra
+weight on weak areas.
+
+A ``Blueprint`` names the tag field whose tags are the domains (``gcp_topics`` by
+default) with the share of the round each one should get, optional minimum/maximum
+questions per ``gcp_products`` tag, and how strongly past mistakes raise a question's
+chance of being drawn. A question counts towards the first of its tags that the
+blueprint lists; the share left over goes to all other questions. A bank may keep its
+default blueprint in ``blueprint.json`` next to its questions.
+
+Rounds are drawn on a ``TagIndex`` of the bank, which holds the tags of every question
+as CSR arrays: weights, strata and quotas are array operations, and the weighted
+sampling without replacement uses Efraimidis-Spirakis keys (``log(u) / weight``, best
+keys win), so a 60 question round over a bank of 50k questions takes milliseconds.
+"""
+
+import logging
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+from pydantic import BaseModel
+
+from models.questions import TAG_FIELDS
+from utils.fileio import atomic_writer
+from utils.repository import QuestionBank, file_version
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_FIELD = "gcp_products"
+
+# question id -> answered correctly, or a function returning it
+Progress = dict[int, bool] | Callable[[], dict[int, bool]]
+
+
+class Blueprint(BaseModel):
+    field: Literal["ml_topics", "gcp_products", "gcp_topics"] = "gcp_topics"
+    shares: dict[str, float] = {}  # domain tag -> share of the round; scaled down if they add up to more than 1
+    product_min: dict[str, int] = {}  # gcp_products tag -> minimum questions in the round
+    product_max: dict[str, int] = {}
+    weakness: float = 1.0  # 0 ignores past accuracy; 1 doubles the weight of a domain answered all wrong
+    unanswered_weight: float = 1.0
+    incorrect_weight: float = 2.0
+    correct_weight: float = 0.25
+
+
+class TagColumn:
+    """Tags of one field: CSR rows (question position -> tag numbers) and their postings."""
+
+    def __init__(self, rows: list[list[str]]):
+        self.lookup: dict[str, int] = {}
+        self.indices = np.array(
+            [self.lookup.setdefault(tag, len(self.lookup)) for tags in rows for tag in tags], dtype=np.int32
+        )
+        self.names = list(self.lookup)
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(tags) for tags in rows], out=self.indptr[1:])
+        self.row_sizes = np.diff(self.indptr)
+        # question position of every entry of ``indices``
+        self.rows = np.repeat(np.arange(len(rows), dtype=np.int64), self.row_sizes)
+        order = np.argsort(self.indices, kind="stable")
+        self.col_indices = self.rows[order]
+        self.counts = np.bincount(self.indices, minlength=len(self.names))
+        self.col_indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.col_indptr[1:])
+
+    def tagged(self, tag: str) -> np.ndarray:
+        """Positions of the questions tagged with ``tag``."""
+        j = self.lookup.get(tag)
+        if j is None:
+            return np.empty(0, dtype=np.int64)
+        return self.col_indices[self.col_indptr[j] : self.col_indptr[j + 1]]
+
+    def tags(self) -> list[tuple[str, int]]:
+        """Tags with their question counts, most frequent first."""
+        order = np.argsort(-self.counts, kind="stable")
+        return [(self.names[j], int(self.counts[j])) for j in order]
+
+
+class TagIndex:
+    """Question ids and tag columns of a bank, for drawing rounds with array operations."""
+
+    def __init__(self, bank: QuestionBank):
+        self.version = bank.version
+        self.question_ids = np.array([q.id for q in bank.questions], dtype=np.int64)
+        self._id_order = np.argsort(self.question_ids, kind="stable")
+        self._sorted_ids = self.question_ids[self._id_order]
+        self.fields = {field: TagColumn([getattr(q, field) for q in bank.questions]) for field in TAG_FIELDS}
+        self._status: tuple | None = None
+        self._errors: dict[str, tuple] = {}  # field -> (progress version, mean error)
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def positions(self, question_ids: np.ndarray) -> np.ndarray:
+        """Positions of ``question_ids`` in the bank, -1 for ids it does not have."""
+        if not len(self):
+            return np.full(len(question_ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_ids, question_ids), len(self) - 1)
+        return np.where(self._sorted_ids[found] == question_ids, self._id_order[found], -1)
+
+    def status(self, progress: Progress, version=None) -> tuple[np.ndarray, np.ndarray]:
+        """Boolean ``answered`` and ``correct`` arrays by question position; cached per progress ``version``."""
+        if version is not None and self._status is not None and self._status[0] == version:
+            return self._status[1]
+        if callable(progress):
+            progress = progress()
+        answered = np.zeros(len(self), dtype=bool)
+        correct = np.zeros(len(self), dtype=bool)
+        positions = self.positions(np.fromiter(progress.keys(), dtype=np.int64, count=len(progress)))
+        results = np.fromiter(progress.values(), dtype=bool, count=len(progress))
+        known = positions >= 0
+        answered[positions[known]] = True
+        correct[positions[known]] = results[known]
+        self._status = (version, (answered, correct))
+        return answered, correct
+
+    def mean_error(self, field: str, progress: Progress, version=None) -> np.ndarray:
+        """Mean error rate of the tags of ``field`` of every question; cached per progress ``version``."""
+        cached = self._errors.get(field)
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+        answered, correct = self.status(progress, version)
+        column = self.fields[field]
+        n_tags = len(column.names)
+        attempts = np.bincount(column.indices, weights=answered[column.rows], minlength=n_tags)
+        wrong = np.bincount(column.indices, weights=(answered & ~correct)[column.rows], minlength=n_tags)
+        # smoothed, so tags nobody answered yet count as half wrong
+        error = (wrong + 1) / (attempts + 2)
+        total = np.bincount(column.rows, weights=error[column.indices], minlength=len(self))
+        mean_error = np.where(column.row_sizes > 0, total / np.maximum(column.row_sizes, 1), 0.5)
+        if version is not None:
+            self._errors[field] = (version, mean_error)
+        return mean_error
+
+    def weights(self, blueprint: Blueprint, progress: Progress, version=None) -> np.ndarray:
+        """Sampling weight of every question: its answer status, raised by the error rate of its domains."""
+        answered, correct = self.status(progress, version)
+        weights = np.where(
+            answered,
+            np.where(correct, blueprint.correct_weight, blueprint.incorrect_weight),
+            blueprint.unanswered_weight,
+        ).astype(np.float64)
+        if blueprint.weakness:
+            weights *= 1 + blueprint.weakness * self.mean_error(blueprint.field, progress, version)
+        return np.maximum(weights, 0)
+
+    def strata(self, blueprint: Blueprint) -> tuple[np.ndarray, np.ndarray]:
+        """Stratum of every question (domain number, or ``len(domains)`` for the rest) and the stratum shares."""
+        column = self.fields[blueprint.field]
+        domains = [tag for tag, share in blueprint.shares.items() if share > 0 and tag in column.lookup]
+        other = len(domains)
+        shares = np.array([blueprint.shares[tag] for tag in domains] + [0.0])
+        shares[other] = max(0.0, 1 - shares.sum())
+        shares /= shares.sum()
+
+        tag_domain = np.full(len(column.names), other, dtype=np.int64)
+        tag_domain[[column.lookup[tag] for tag in domains]] = np.arange(other)
+        entry_domain = tag_domain[column.indices]
+        listed = entry_domain < other
+        strata = np.full(len(self), other, dtype=np.int64)
+        # entries are in row order, so the first listed entry of each row is its first domain tag
+        entries = np.flatnonzero(listed)
+        rows = column.rows[entries]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        strata[rows[first]] = entry_domain[entries[first]]
+        return strata, shares
+
+
+def allocate(size: int, shares: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    """Questions per stratum: ``size`` split by ``shares`` (largest remainder), capped at ``capacity``.
+
+    What full strata cannot take goes to the others by their shares, and then to strata
+    without a share.
+    """
+    quota = np.zeros(len(shares), dtype=np.int64)
+    remaining = int(min(size, capacity.sum()))
+    for weights in (shares, capacity.astype(np.float64)):
+        open_ = (weights > 0) & (quota < capacity)
+        while remaining > 0 and open_.any():
+            masked = np.where(open_, weights, 0.0)
+            exact = remaining * masked / masked.sum()
+            add = np.floor(exact).astype(np.int64)
+            add[np.argsort(add - exact, kind="stable")[: remaining - add.sum()]] += 1
+            add = np.minimum(add, capacity - quota)
+            quota += add
+            remaining -= int(add.sum())
+            open_ &= quota < capacity
+    return quota
+
+
+def _top_per_stratum(keys: np.ndarray, strata: np.ndarray, quota: np.ndarray, eligible: np.ndarray) -> np.ndarray:
+    """Positions of the ``quota[s]`` best keys of every stratum ``s`` among the eligible questions."""
+    candidates = np.flatnonzero(eligible)
+    # as 16 bit integers the stable sort is a radix sort
+    order = candidates[np.argsort(strata[candidates].astype(np.uint16), kind="stable")]
+    bounds = np.searchsorted(strata[order], np.arange(len(quota) + 1))
+    picked = [np.empty(0, dtype=np.int64)]
+    for stratum in np.flatnonzero(quota):
+        group = order[bounds[stratum] : bounds[stratum + 1]]
+        k = min(int(quota[stratum]), len(group))
+        picked.append(group[np.argpartition(-keys[group], k - 1)[:k]])
+    return np.concatenate(picked)
+
+
+def _pick(
+    keys: np.ndarray, mask: np.ndarray, strata: np.ndarray, stratum: int | None = None, lowest: bool = False
+) -> int | None:
+    """Position with the best (or ``lowest``) key in ``mask``, from ``stratum`` if it has one."""
+    preferred = () if stratum is None else (mask & (strata == stratum),)
+    for candidates in (*preferred, mask):
+        positions = np.flatnonzero(candidates)
+        if positions.size:
+            k = keys[positions]
+            return int(positions[np.argmin(k) if lowest else np.argmax(k)])
+    return None
+
+
+def _apply_limits(
+    index: TagIndex,
+    blueprint: Blueprint,
+    chosen: np.ndarray,
+    keys: np.ndarray,
+    strata: np.ndarray,
+    eligible: np.ndarray,
+):
+    """Swap questions in and out of ``chosen`` until the product minimums and maximums hold.
+
+    Every swap stays in the stratum of the question it replaces where possible; limits
+    the bank cannot satisfy are given up on.
+    """
+    products = sorted(blueprint.product_min.keys() | blueprint.product_max.keys())
+    if not products:
+        return
+    column = index.fields[PRODUCT_FIELD]
+    tagged = np.zeros((len(products), len(index)), dtype=bool)
+    for k, product in enumerate(products):
+        tagged[k, column.tagged(product)] = True
+    low = np.array([blueprint.product_min.get(p, 0) for p in products])
+    high = np.array([blueprint.product_max.get(p, len(index)) for p in products])
+    counts = tagged[:, chosen].sum(axis=1)
+    stuck = np.zeros(len(products), dtype=bool)
+
+    # every swap fixes one question of one limit; the bound only guards against swaps undoing each other
+    for _ in range(int(chosen.sum()) * len(products) + 1):
+        over = np.flatnonzero((counts > high) & ~stuck)
+        under = np.flatnonzero((counts < low) & ~stuck)
+        full = tagged[counts >= high].any(axis=0)
+        if over.size:
+            k = over[0]
+            out = _pick(keys, chosen & tagged[k], strata, lowest=True)
+            into = _pick(keys, ~chosen & eligible & ~full, strata, strata[out])
+        elif under.size:
+            k = under[0]
+            into = _pick(keys, ~chosen & eligible & tagged[k] & ~full, strata)
+            # carriers of products at or below their minimum stay
+            keep = tagged[counts <= low].any(axis=0)
+            out = None if into is None else _pick(keys, chosen & ~keep, strata, strata[into], lowest=True)
+            if out is None:
+                stuck[k] = True
+                continue
+        else:
+            break
+        chosen[out] = False
+        counts -= tagged[:, out]
+        if into is not None:
+            chosen[into] = True
+            counts += tagged[:, into]
+
+
+def build_round(
+    index: TagIndex,
+    blueprint: Blueprint,
+    progress: Progress,
+    size: int,
+    rng: np.random.Generator | None = None,
+    version=None,
+) -> list[int]:
+    """Ids of a shuffled round of up to ``size`` questions drawn according to ``blueprint``.
+
+    ``version`` identifies the state of ``progress`` (see ``utils.progress_version``), so
+    the answer status and error rates are only recomputed when it changes; ``progress``
+    may then be a function that loads it, called only in that case.
+    """
+    rng = rng or np.random.default_rng()
+    weights = index.weights(blueprint, progress, version)
+    eligible = weights > 0
+    strata, shares = index.strata(blueprint)
+    quota = allocate(size, shares, np.bincount(strata[eligible], minlength=len(shares)))
+    with np.errstate(divide="ignore"):
+        keys = np.log(rng.random(len(index))) / weights
+    chosen = np.zeros(len(index), dtype=bool)
+    chosen[_top_per_stratum(keys, strata, quota, eligible)] = True
+    _apply_limits(index, blueprint, chosen, keys, strata, eligible)
+    positions = np.flatnonzero(chosen)
+    rng.shuffle(positions)
+    return index.question_ids[positions].tolist()
+
+
+def read_blueprint(path: Path) -> Blueprint:
+    """The blueprint stored at ``path``, or the default one if there is none."""
+    if not path.exists():
+        return Blueprint()
+    return Blueprint.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def write_blueprint(path: Path, blueprint: Blueprint):
+    with atomic_writer(path) as f:
+        f.write(blueprint.model_dump_json(indent=2) + "\n")
+
+
+_indexes: dict[Path, TagIndex] = {}
+_blueprints: dict[Path, tuple[tuple | None, Blueprint]] = {}
+_lock = threading.Lock()
+
+
+def get_tag_index(bank: QuestionBank) -> TagIndex:
+    """Shared tag index of ``bank``, rebuilt when the bank changes."""
+    index = _indexes.get(bank.path)
+    if index is not None and index.version == bank.version:
+        return index
+    with _lock:
+        index = _indexes.get(bank.path)
+        if index is None or index.version != bank.version:
+            index = TagIndex(bank)
+            _indexes[bank.path] = index
+    return index
+
+
+def get_blueprint(path: Path) -> Blueprint:
+    """The blueprint stored at ``path``, read again when the file changes."""
+    version = file_version(path)
+    with _lock:
+        cached = _blueprints.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    try:
+        blueprint = read_blueprint(path)
+    except ValueError as e:
+        logger.warning(f"Ignoring invalid {path}: {e}")
+        blueprint = Blueprint()
+    with _lock:
+        _blueprints[path] = (version, blueprint)
+    return blueprint
+
+
+def invalidate(path: Path | None = None):
+    with _lock:
+        if path is None:
+            _indexes.clear()
+            _blueprints.clear()
+        else:
+            _indexes.pop(path, None)
+            _blueprints.pop(path, None)
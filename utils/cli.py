@@ -0,0 +1,279 @@
+"""Command line interface of the quiz app (installed as ``quiz``).
+
+    quiz stats
+    quiz round --size 10                  # answer a round in the terminal
+    quiz round --kind blueprint --size 60 # a round drawn to the bank's blueprint.json
+    quiz grade answers.json --record      # grade {question id: [option indexes]} in bulk
+    quiz merge alice/progress.json bob/progress.log.jsonl
+    quiz gaps --field gcp_products
+    quiz report cohort/                   # one line of stats per learner
+    quiz calibrate cohort/                # question difficulties from the cohort (IRT)
+    quiz validate
+    quiz export --state incorrect --format anki --output wrong.csv
+    quiz serve                            # start the Streamlit app
+
+``--data DIR`` points the commands at another data directory and
+``--bank NAME`` at one of its question banks (``quiz banks`` lists them).
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import utils
+from models.questions import TAG_FIELDS
+from utils import api
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _letters(choice: list[int]) -> str:
+    return ",".join(chr(65 + i) for i in choice)
+
+
+def _parse_choice(text: str, n_options: int) -> list[int] | None:
+    choice = []
+    for part in text.replace(" ", "").upper().split(","):
+        if len(part) != 1 or not "A" <= part < chr(65 + n_options):
+            return None
+        choice.append(ord(part) - 65)
+    return choice
+
+
+def cmd_banks(args):
+    for bank in utils.list_banks().values():
+        print(f"{bank.name:<20} {bank.title:<40} {bank.data_dir}")
+
+
+def cmd_stats(args):
+    bank = utils.load_question_bank()
+    total = len(bank)
+    # progress can hold answers to questions since merged or deleted from the bank
+    progress = {k: v for k, v in utils.load_progress().items() if k in bank.by_id}
+    _, correct, wrong, _ = utils.compute_stats(progress)
+    stats = {
+        "total": total,
+        "unanswered": total - (correct + wrong),
+        "correct": correct,
+        "wrong": wrong,
+        "due": utils.load_scheduler().count_due(),
+    }
+    print(json.dumps(stats, indent=2))
+
+
+def cmd_round(args):
+    blueprint = None
+    if args.blueprint:
+        from utils.blueprint import read_blueprint
+
+        blueprint = read_blueprint(args.blueprint)
+    quiz = api.start_round(
+        args.kind,
+        size=args.size,
+        include_incorrect=args.include_incorrect,
+        correct_pct=args.correct_pct,
+        query=args.query,
+        product=args.product,
+        depth=args.depth,
+        seed=args.seed,
+        blueprint=blueprint,
+    )
+    while (q := quiz.current()) is not None:
+        print(f"\nQuestion #{q.id} ({quiz.pos + 1}/{len(quiz.question_ids)})\n{q.question}\n")
+        for i, option in enumerate(q.options):
+            print(f"  {chr(65 + i)}. {option}")
+        while True:
+            text = input("\nAnswer (e.g. A or A,C; s = skip, q = quit): ").strip()
+            if text.lower() in ("s", "q"):
+                break
+            choice = _parse_choice(text, len(q.options))
+            if choice is not None:
+                break
+            print("Please answer with option letters.")
+        if text.lower() == "q":
+            break
+        if text.lower() == "s":
+            quiz.skip()
+            continue
+        answers = q.answer if isinstance(q.answer, list) else [q.answer]
+        print("Correct ✅" if quiz.answer(choice) else f"Incorrect ❌, correct answer: {_letters(answers)}")
+        if args.explain and q.explanation:
+            print(f"\n{q.explanation}")
+
+    asked, correct, wrong, pct = quiz.stats()
+    print(f"\nAsked: {asked} — Correct: {correct} — Wrong: {wrong} — Success: {pct:.1f}%")
+    if asked and not args.no_save:
+        quiz.save()
+        print("Round results merged into overall progress.")
+
+
+def cmd_grade(args):
+    answers = {int(k): v if isinstance(v, list) else [v] for k, v in json.loads(args.answers.read_text()).items()}
+    unknown = [question_id for question_id in answers if utils.get_question(question_id) is None]
+    for question_id in unknown:
+        print(f"Unknown question {question_id}", file=sys.stderr)
+        del answers[question_id]
+    quiz = api.QuizRound(list(answers))
+    results = {question_id: quiz.answer(choice) for question_id, choice in answers.items()}
+    asked, correct, wrong, pct = quiz.stats()
+    print(json.dumps({"results": results, "asked": asked, "correct": correct, "wrong": wrong, "pct": pct}, indent=2))
+    if args.record:
+        quiz.save()
+
+
+def cmd_merge(args):
+    merged = api.merge_progress(args.files, record=not args.dry_run)
+    print(f"{'Would merge' if args.dry_run else 'Merged'} {len(merged)} answers from {len(args.files)} files.")
+
+
+def cmd_gaps(args):
+    import pandas as pd
+
+    if args.field == "products":
+        df = api.product_gaps(args.min_attempts)
+    else:
+        df = api.knowledge_gaps(args.field, args.min_attempts)
+    df = df.head(args.top)
+    if "last_seen" in df:
+        df["last_seen"] = pd.to_datetime(df["last_seen"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+    print(df.to_json(orient="records", indent=2) if args.json else df.to_string(index=False))
+
+
+def cmd_report(args):
+    reports = []
+    for name, paths in api.cohort_files(args.cohort).items():
+        events = [event for path in paths for event in api.read_progress_file(path)]
+        reports.append({"learner": name, **api.progress_report(events, args.field)})
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for r in reports:
+        weakest = ", ".join(f"{w['topic']} ({w['accuracy']:.0%})" for w in r["weakest"][:3])
+        print(f"{r['learner']:<40} {r['answered']:>5} answered {r['accuracy']:>6.1f}%  weakest: {weakest}")
+
+
+def cmd_calibrate(args):
+    try:
+        calibration = api.calibrate(args.cohort, args.include_own, args.iterations, args.output)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"Calibrated {len(calibration)} questions from {len(calibration.abilities)} learners.")
+    readiness = utils.compute_readiness()
+    if readiness is not None and not args.output:
+        print(
+            f"Your ability {readiness['ability']:+.2f}, expected exam score {readiness['expected_score']:.0%}, "
+            f"pass probability {readiness['pass_probability']:.0%}"
+        )
+
+
+def cmd_validate(args):
+    from utils import validation
+
+    report = api.validate_bank(args.quizzes, args.threshold)
+    validation.print_report(report)
+    if args.report:
+        args.report.write_text(json.dumps(report.to_dict(), indent=2), encoding="utf-8")
+    if args.merged:
+        validation.merge_duplicates(report.path, report, args.merged)
+    sys.exit(1 if report.errors else 0)
+
+
+def cmd_export(args):
+    from utils import export
+
+    export.main(args.extra)
+
+
+def cmd_serve(args):
+    command = [sys.executable, "-m", "streamlit", "run", str(ROOT / "🏠_Dashboard.py"), *args.extra]
+    env = {**os.environ, "QUIZ_DATA_DIR": str(utils.DATA_DIR.resolve())}
+    sys.exit(subprocess.call(command, cwd=ROOT, env=env))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="quiz", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--data", type=Path, help="data directory (default: the repository's data/)")
+    parser.add_argument("--bank", help="question bank (default: the one in the data directory itself)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("banks", help="list the question banks").set_defaults(func=cmd_banks)
+    sub.add_parser("stats", help="overall progress").set_defaults(func=cmd_stats)
+
+    rnd = sub.add_parser("round", help="answer a round in the terminal")
+    rnd.add_argument("--kind", choices=["new", "due", "search", "product", "blueprint"], default="new")
+    rnd.add_argument("--size", type=int, default=10)
+    rnd.add_argument("--include-incorrect", action="store_true", help="also ask previously wrong questions")
+    rnd.add_argument("--correct-pct", type=int, default=0, help="percentage of correct ones to repeat")
+    rnd.add_argument("--query", help="search terms for --kind search")
+    rnd.add_argument("--product", help="product for --kind product")
+    rnd.add_argument("--depth", type=int, default=0, help="product graph neighbors to include")
+    rnd.add_argument("--blueprint", type=Path, help="blueprint JSON for --kind blueprint (default: the bank's)")
+    rnd.add_argument("--seed", type=int)
+    rnd.add_argument("--explain", action="store_true", help="print the explanation after each answer")
+    rnd.add_argument("--no-save", action="store_true", help="do not merge the results into the progress")
+    rnd.set_defaults(func=cmd_round)
+
+    grd = sub.add_parser("grade", help="grade a JSON file of {question id: option indexes}")
+    grd.add_argument("answers", type=Path)
+    grd.add_argument("--record", action="store_true", help="merge the graded answers into the progress")
+    grd.set_defaults(func=cmd_grade)
+
+    mrg = sub.add_parser("merge", help="merge progress files (snapshots or event logs) into the progress")
+    mrg.add_argument("files", type=Path, nargs="+")
+    mrg.add_argument("--dry-run", action="store_true")
+    mrg.set_defaults(func=cmd_merge)
+
+    gaps = sub.add_parser("gaps", help="weakest topics or products")
+    gaps.add_argument("--field", choices=[*TAG_FIELDS, "products"], default="gcp_topics")
+    gaps.add_argument("--min-attempts", type=int, default=1)
+    gaps.add_argument("--top", type=int, default=20)
+    gaps.add_argument("--json", action="store_true")
+    gaps.set_defaults(func=cmd_gaps)
+
+    rep = sub.add_parser("report", help="stats for every progress file under a directory")
+    rep.add_argument("cohort", type=Path)
+    rep.add_argument("--field", choices=TAG_FIELDS, default="gcp_topics")
+    rep.add_argument("--json", action="store_true")
+    rep.set_defaults(func=cmd_report)
+
+    cal = sub.add_parser("calibrate", help="fit question difficulties from a cohort's progress files (2PL IRT)")
+    cal.add_argument("cohort", type=Path)
+    cal.add_argument("--include-own", action="store_true", help="add this deployment's progress as a learner")
+    cal.add_argument("--iterations", type=int, help="maximum fitting iterations")
+    cal.add_argument("--output", type=Path, help="write here instead of the bank's calibration.json")
+    cal.set_defaults(func=cmd_calibrate)
+
+    val = sub.add_parser("validate", help="check the question file and find near-duplicate questions")
+    val.add_argument("quizzes", type=Path, nargs="?")
+    val.add_argument("--threshold", type=float, help="Jaccard similarity of near-duplicates")
+    val.add_argument("--report", type=Path, help="write the full report as JSON")
+    val.add_argument("--merged", type=Path, help="write the bank with duplicates merged to this file")
+    val.set_defaults(func=cmd_validate)
+
+    # these two hand any further arguments on to python -m utils.export / streamlit run
+    exp = sub.add_parser("export", help="export questions (options as in python -m utils.export)", add_help=False)
+    exp.set_defaults(func=cmd_export)
+    sub.add_parser("serve", help="start the Streamlit app").set_defaults(func=cmd_serve)
+
+    args, args.extra = parser.parse_known_args(argv)
+    if args.extra and args.command not in ("export", "serve"):
+        parser.error(f"unrecognized arguments: {' '.join(args.extra)}")
+    logging.basicConfig(level=logging.WARNING)
+    if args.data:
+        api.use_data_dir(args.data)
+    if args.bank:
+        try:
+            api.use_bank(args.bank)
+        except ValueError as e:
+            parser.error(str(e))
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Streaming export of questions to Markdown, JSONL, Anki CSV and LLM-sized chunks.
+
+Questions are selected lazily and every format renders one question at a time, so
+exports are written to disk piece by piece instead of being joined in memory::
+
+    python -m utils.export --state incorrect --format markdown --output wrong.md
+    python -m utils.export --state incorrect not_answered --chunk-tokens 8000 --output chunks/
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import re
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+
+from models.progress import AnswerEvent
+from models.questions import TAG_FIELDS, Question
+from utils.fileio import atomic_writer
+
+logger = logging.getLogger(__name__)
+
+STATES = ("incorrect", "not_answered", "correct")
+# rough characters per token, used to size chunks for LLM context windows
+CHARS_PER_TOKEN = 4
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _correct_options(q: Question) -> list[str]:
+    answers = q.answer if isinstance(q.answer, list) else [q.answer]
+    return [q.options[a] for a in answers]
+
+
+class MarkdownFormat:
+    extension = "md"
+    mime = "text/markdown"
+
+    def header(self) -> str:
+        return "\n".join(
+            [
+                "# Questions that I lack knowledge of\n",
+                "Below is a list of questions that I answered incorrectly. "
+                "I should review these topics to improve my understanding.",
+                "Use all these questions as starting point to create flashcards and quizzes for me to study.",
+                "Use related knowledge to create additional questions to help me learn the topics better.\n",
+                "",
+            ]
+        )
+
+    def record(self, q: Question) -> str:
+        lines = [
+            f"## Question ID: {q.id}\n",
+            f"### Question: \n\n {q.question}\n",
+            "### Answer Options:",
+            *[f"- {answer}" for answer in q.options],
+            "\n### Correct Answer:\n",
+            *[f"- {answer}" for answer in _correct_options(q)],
+            "---\n",
+            "",
+        ]
+        return "\n".join(lines)
+
+
+class JsonlFormat:
+    extension = "jsonl"
+    mime = "application/jsonl"
+
+    def header(self) -> str:
+        return ""
+
+    def record(self, q: Question) -> str:
+        return json.dumps(q.model_dump(), ensure_ascii=False) + "\n"
+
+
+class AnkiFormat:
+    """Front/back/tags rows that Anki imports as basic notes (HTML allowed)."""
+
+    extension = "csv"
+    mime = "text/csv"
+
+    def header(self) -> str:
+        return "#separator:Comma\n#html:true\n#tags column:3\n"
+
+    def record(self, q: Question) -> str:
+        front = q.question + "<ol type='A'>" + "".join(f"<li>{o}</li>" for o in q.options) + "</ol>"
+        back = "<br>".join(_correct_options(q)) + "<hr>" + (q.explanation or "")
+        tags = " ".join(t.replace(" ", "_") for field in TAG_FIELDS for t in getattr(q, field))
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerow([front, back, tags])
+        return buf.getvalue()
+
+
+class TextFormat:
+    """Plain text with the HTML stripped; the densest option for LLM prompts."""
+
+    extension = "txt"
+    mime = "text/plain"
+
+    def header(self) -> str:
+        return ""
+
+    def record(self, q: Question) -> str:
+        options = "\n".join(f"{chr(65 + i)}. {_TAG_RE.sub('', o)}" for i, o in enumerate(q.options))
+        answers = ", ".join(_TAG_RE.sub("", a) for a in _correct_options(q))
+        explanation = _TAG_RE.sub("", q.explanation or "").strip()
+        return f"Q{q.id}: {_TAG_RE.sub('', q.question).strip()}\n{options}\nAnswer: {answers}\n{explanation}\n\n"
+
+
+FORMATS = {
+    "markdown": MarkdownFormat(),
+    "jsonl": JsonlFormat(),
+    "anki": AnkiFormat(),
+    "text": TextFormat(),
+}
+
+
+def select_questions(
+    questions: Iterable[Question],
+    progress: dict[int, bool],
+    states: Iterable[str] = STATES,
+    tags: Iterable[str] = (),
+    since: float | None = None,
+    history: Iterable[AnswerEvent] = (),
+) -> Iterator[Question]:
+    """Lazily yield the questions in one of ``states`` carrying any of ``tags``.
+
+    With ``since`` only questions answered at or after that timestamp are kept, which
+    needs the answer ``history``.
+    """
+    states = set(states)
+    tags = set(tags)
+    last_answered: dict[int, float] = {}
+    if since is not None:
+        for event in history:
+            last_answered[event.id] = max(event.ts, last_answered.get(event.id, event.ts))
+    for q in questions:
+        state = "not_answered" if q.id not in progress else "correct" if progress[q.id] else "incorrect"
+        if state not in states:
+            continue
+        if tags and not tags.intersection(t for field in TAG_FIELDS for t in getattr(q, field)):
+            continue
+        if since is not None and last_answered.get(q.id, float("-inf")) < since:
+            continue
+        yield q
+
+
+def stream(fmt: str, questions: Iterable[Question]) -> Iterator[str]:
+    """Render ``questions`` in ``fmt`` one piece at a time, header first."""
+    writer = FORMATS[fmt]
+    header = writer.header()
+    if header:
+        yield header
+    for q in questions:
+        yield writer.record(q)
+
+
+def write_file(path: Path, fmt: str, questions: Iterable[Question]) -> int:
+    """Stream an export into ``path``; returns the number of questions written."""
+    writer = FORMATS[fmt]
+    count = 0
+    with atomic_writer(path) as f:
+        f.write(writer.header())
+        for q in questions:
+            f.write(writer.record(q))
+            count += 1
+    logger.info(f"Exported {count} questions to {path}")
+    return count
+
+
+def write_chunks(directory: Path, fmt: str, questions: Iterable[Question], max_tokens: int) -> list[Path]:
+    """Stream an export into numbered files of at most ``max_tokens`` (estimated) each.
+
+    Files only break between questions and each repeats the format header; a single
+    question larger than the budget gets a file of its own.
+    """
+    writer = FORMATS[fmt]
+    header = writer.header()
+    budget = max_tokens * CHARS_PER_TOKEN
+    directory.mkdir(parents=True, exist_ok=True)
+    paths: list[Path] = []
+    f = None
+    size = 0
+    try:
+        for q in questions:
+            text = writer.record(q)
+            if f is None or (size > len(header) and size + len(text) > budget):
+                if f is not None:
+                    f.close()
+                paths.append(directory / f"part-{len(paths) + 1:03d}.{writer.extension}")
+                f = paths[-1].open("w", encoding="utf-8")
+                f.write(header)
+                size = len(header)
+            f.write(text)
+            size += len(text)
+    finally:
+        if f is not None:
+            f.close()
+    logger.info(f"Exported {len(paths)} chunks to {directory}")
+    return paths
+
+
+def main(argv: list[str] | None = None):
+    import utils
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, default="markdown")
+    parser.add_argument("--state", choices=STATES, nargs="+", default=["incorrect"], help="progress states to export")
+    parser.add_argument("--tag", nargs="+", default=[], help="only questions carrying any of these tags")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only questions answered on or after this date")
+    parser.add_argument("--chunk-tokens", type=int, help="split into files of about this many tokens")
+    parser.add_argument("--output", type=Path, required=True, help="output file, or directory with --chunk-tokens")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    since = args.since.timestamp() if args.since else None
+    questions = select_questions(
+        utils.load_question_bank().questions,
+        utils.load_progress(),
+        args.state,
+        args.tag,
+        since,
+        utils.load_answer_history() if since is not None else (),
+    )
+    if args.chunk_tokens:
+        write_chunks(args.output, args.format, questions, args.chunk_tokens)
+    else:
+        write_file(args.output, args.format, questions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from utils.repository import QuestionBank, file_version
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# rendered graph HTML kept per (catalog version, selection, depth)
+HTML_CACHE_SIZE = 64
+
+# question tags that name a catalog product differently, by normalized key
+ALIASES = {
+    "datastudio": "lookerstudio",
+    "dlvm": "deeplearningvmimage",
+    "kfp": "kubeflowpipeline",
+    "kubeflowpipelinessdk": "kubeflowpipeline",
+    "runfunction": "function",
+    "kms": "keymanagementservice",
+    "speech": "speechtotext",
+    "vertexfeaturestore": "vertexaifeaturestore",
+    "vertexpipeline": "vertexaipipeline",
+    "vertexainotebook": "vertexaiworkbench",
+    "dialogflowenterpriseedition": "dialogflow",
+}
+
+_PAREN_RE = re.compile(r"\(([^)]*)\)")
+_PREFIX_RE = re.compile(r"^(google cloud platform|google cloud|google|cloud)\s+")
+_SUFFIX_RE = re.compile(r"\s+apis?$")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_token(x: str) -> str:
+    return re.sub(r"\s+", " ", x.strip())
+
+
+def _key(text: str) -> str:
+    text = _SUFFIX_RE.sub("", _PREFIX_RE.sub("", text.strip().lower()))
+    key = _NON_ALNUM_RE.sub("", text)
+    if len(key) > 3 and key.endswith("s"):
+        key = key[:-1]
+    return ALIASES.get(key, key)
+
+
+def product_keys(name: str) -> list[str]:
+    """Normalized lookup keys of a product name: the name without vendor prefixes, ``API``
+    suffix, punctuation and plural ``s``, plus any parenthesized abbreviation."""
+    keys = [_key(_PAREN_RE.sub(" ", name))]
+    keys += [_key(alias) for alias in _PAREN_RE.findall(name)]
+    return [k for k in dict.fromkeys(keys) if k]
+
+
+def extract_ui_tags(ui_list):
+    # lightweight tagging so users can filter
+    tags = set()
+    for ui in ui_list:
+        u = ui.lower()
+        if "console" in u or "web ui" in u:
+            tags.add("Console / Web UI")
+        if "python" in u or "sdk" in u or "client" in u:
+            tags.add("SDK / Client Libraries")
+        if "cli" in u or "gcloud" in u or "bq tool" in u:
+            tags.add("CLI")
+        if "rest" in u or "api" in u:
+            tags.add("API")
+        if "sql" in u:
+            tags.add("SQL")
+    return sorted(tags)
+
+
+def to_rows(data):
+    rows = []
+    for p in data:
+        rows.append(
+            {
+                "product_name": p["product_name"],
+                "entity_type": p.get("entity_type", ""),
+                "ui": p.get("ui", []),
+                "ui_tags": extract_ui_tags(p.get("ui", [])),
+                "connected_to": [normalize_token(x) for x in p.get("connected_to", [])],
+                "short_description": p.get("short_description", ""),
+                "use_cases": p.get("use_cases", []),
+                "not_used_when": p.get("not_used_when", []),
+            }
+        )
+    return rows
+
+
+class ProductGraph:
+    """Undirected product/dependency graph in compressed sparse row form.
+
+    Nodes are numbered ``0..n-1`` (products first, then dependencies that are not
+    products themselves); the neighbours of node ``i`` are
+    ``indices[indptr[i]:indptr[i + 1]]``.
+    """
+
+    def __init__(self, rows: list[dict], version: tuple | None = None):
+        self.version = version
+        self.rows = rows
+        self.names: list[str] = [r["product_name"] for r in rows]
+        self.n_products = len(self.names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.entity_types = [r["entity_type"] for r in rows]
+        edges = set()
+        # product -> connected_to node ids, as listed in the catalog
+        self.links: list[list[int]] = []
+        for r in rows:
+            u = self.index[r["product_name"]]
+            targets = []
+            for dep in r["connected_to"]:
+                if dep not in self.index:
+                    self.index[dep] = len(self.names)
+                    self.names.append(dep)
+                v = self.index[dep]
+                targets.append(v)
+                if u != v:
+                    edges.add((min(u, v), max(u, v)))
+            self.links.append(sorted(set(targets)))
+        n = len(self.names)
+        pairs = np.array(sorted(edges), dtype=np.int32).reshape(-1, 2)
+        self.edges = pairs
+        src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        order = np.lexsort((dst, src))
+        self.indices = dst[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_product(self, node: int) -> bool:
+        return node < self.n_products
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node] : self.indptr[node + 1]]
+
+    def neighborhood(self, name: str, depth: int = 1) -> dict[str, int]:
+        """Nodes within ``depth`` hops of ``name``, mapped to their distance."""
+        start = self.index.get(name)
+        if start is None:
+            return {}
+        seen = np.full(len(self.names), -1, dtype=np.int32)
+        seen[start] = 0
+        frontier = np.array([start])
+        for hop in range(1, depth + 1):
+            if frontier.size == 0:
+                break
+            nxt = np.unique(np.concatenate([self.neighbors(i) for i in frontier]))
+            nxt = nxt[seen[nxt] < 0]
+            seen[nxt] = hop
+            frontier = nxt
+        return {self.names[i]: int(seen[i]) for i in np.flatnonzero(seen >= 0)}
+
+    @cached_property
+    def capabilities(self) -> "CapabilityIndex":
+        return CapabilityIndex(self)
+
+    def render_html(self, selected: str | None = None, depth: int = 1) -> str:
+        """PyVis HTML of the graph; with ``selected`` its neighbourhood is emphasised and the rest dimmed."""
+        from pyvis.network import Network
+
+        net = Network(height="700px", width="100%", bgcolor="#0e1117", font_color="#e6e6e6", directed=False)
+        net.barnes_hut(gravity=-20000, central_gravity=0.3, spring_length=140, spring_strength=0.03, damping=0.09)
+
+        focus = self.neighborhood(selected, depth) if selected else {}
+        for i, name in enumerate(self.names):
+            node_type = "product" if self.is_product(i) else "dependency"
+            title = f"<b>{name}</b><br/>Type: {node_type}"
+            if node_type == "product":
+                title += f"<br/>Entity: {self.entity_types[i]}"
+                shape = "box"
+            else:
+                shape = "dot"
+
+            # Visual emphasis: selected + neighborhood vs dimmed
+            if selected:
+                if name == selected:
+                    opacity = 1.0
+                    value = 40
+                elif name in focus:
+                    opacity = 0.9
+                    value = 22 if node_type == "product" else 16
+                else:
+                    opacity = 0.2
+                    value = 10
+            else:
+                opacity = 0.95
+                value = 22 if node_type == "product" else 14
+
+            net.add_node(name, label=name, title=title, shape=shape, value=value, opacity=opacity)
+
+        for u, v in self.edges:
+            both_products = self.is_product(u) and self.is_product(v)
+            net.add_edge(self.names[u], self.names[v], width=2 if both_products else 1)
+
+        return net.generate_html()
+
+
+class CapabilityIndex:
+    """Sparse product x dependency incidence of the catalog's ``connected_to`` lists.
+
+    Rows are kept in CSR form (``indptr``/``indices``) and columns as postings
+    (``col_indptr``/``col_indices``), so similarity and popularity queries touch only
+    the non-zero entries instead of a dense products x dependencies grid.
+    """
+
+    def __init__(self, graph: ProductGraph):
+        self.products = graph.names[: graph.n_products]
+        self.product_index = {name: i for i, name in enumerate(self.products)}
+        node_ids = sorted({v for targets in graph.links for v in targets}, key=lambda v: graph.names[v])
+        column = {v: j for j, v in enumerate(node_ids)}
+        self.dependencies = [graph.names[v] for v in node_ids]
+        self.dependency_index = {name: j for j, name in enumerate(self.dependencies)}
+
+        self.indptr = np.zeros(len(self.products) + 1, dtype=np.int64)
+        np.cumsum([len(targets) for targets in graph.links], out=self.indptr[1:])
+        self.indices = np.array([column[v] for targets in graph.links for v in targets], dtype=np.int32)
+        self.row_sizes = np.diff(self.indptr)
+
+        rows = np.repeat(np.arange(len(self.products), dtype=np.int32), self.row_sizes)
+        order = np.argsort(self.indices, kind="stable")
+        self.col_indices = rows[order]
+        self.counts = np.bincount(self.indices, minlength=len(self.dependencies))
+        self.col_indptr = np.zeros(len(self.dependencies) + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.col_indptr[1:])
+
+    def row(self, product: int) -> np.ndarray:
+        return self.indices[self.indptr[product] : self.indptr[product + 1]]
+
+    def _rows(self, products: list[str] | None) -> np.ndarray | None:
+        if products is None:
+            return None
+        return np.array([self.product_index[p] for p in products if p in self.product_index], dtype=np.int32)
+
+    def top_dependencies(self, n: int | None = None, products: list[str] | None = None) -> list[tuple[str, int]]:
+        """Most connected dependencies with their product counts, optionally within ``products``."""
+        rows = self._rows(products)
+        if rows is None:
+            counts = self.counts
+        else:
+            cols = np.concatenate([self.row(r) for r in rows]) if rows.size else np.empty(0, dtype=np.int32)
+            counts = np.bincount(cols, minlength=len(self.dependencies))
+        order = np.argsort(-counts, kind="stable")
+        order = order[counts[order] > 0][:n]
+        return [(self.dependencies[j], int(counts[j])) for j in order]
+
+    def products_with(self, dependency: str) -> list[str]:
+        """Products that list ``dependency`` in their connections."""
+        j = self.dependency_index.get(dependency)
+        if j is None:
+            return []
+        return [self.products[i] for i in self.col_indices[self.col_indptr[j] : self.col_indptr[j + 1]]]
+
+    def similar(self, product: str, n: int = 10) -> list[tuple[str, float, int]]:
+        """Products ranked by Jaccard similarity of their connections to ``product``.
+
+        Returns ``(name, jaccard, shared connections)``; products sharing nothing are left out.
+        """
+        i = self.product_index.get(product)
+        if i is None:
+            return []
+        cols = self.row(i)
+        if cols.size == 0:
+            return []
+        hits = np.concatenate([self.col_indices[self.col_indptr[j] : self.col_indptr[j + 1]] for j in cols])
+        shared = np.bincount(hits, minlength=len(self.products))
+        shared[i] = 0
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (self.row_sizes[candidates] + cols.size - shared[candidates])
+        order = np.lexsort((candidates, -scores))[:n]
+        return [(self.products[candidates[k]], float(scores[k]), int(shared[candidates[k]])) for k in order]
+
+    def frame(self, products: list[str], dependencies: list[str]) -> "pd.DataFrame":
+        """Dense boolean grid, but only for the rows and columns being displayed."""
+        import pandas as pd
+
+        cols = {self.dependency_index[d]: k for k, d in enumerate(dependencies)}
+        grid = np.zeros((len(products), len(dependencies)), dtype=bool)
+        for r, name in enumerate(products):
+            for j in self.row(self.product_index[name]):
+                k = cols.get(int(j))
+                if k is not None:
+                    grid[r, k] = True
+        return pd.DataFrame(grid, index=pd.Index(products, name="product_name"), columns=dependencies)
+
+
+class QuestionLinks:
+    """Cross-index from product graph nodes to the questions tagged with them.
+
+    Question ``gcp_products`` tags are matched to graph nodes by ``product_keys``;
+    tags that match nothing are kept in ``unmatched`` so the catalog can be extended.
+    """
+
+    def __init__(self, graph: ProductGraph, bank: QuestionBank):
+        self.version = (graph.version, bank.version)
+        self.graph = graph
+        lookup: dict[str, int] = {}
+        for node, name in enumerate(graph.names):
+            for key in product_keys(name):
+                # products win over dependency nodes with the same key
+                lookup.setdefault(key, node)
+        self.question_ids = np.array([q.id for q in bank.questions], dtype=np.int64)
+        node_questions: dict[int, list[int]] = {}
+        self.unmatched: dict[str, int] = {}
+        for position, question in enumerate(bank.questions):
+            for tag in question.gcp_products:
+                node = next((lookup[k] for k in product_keys(tag) if k in lookup), None)
+                if node is None:
+                    self.unmatched[tag] = self.unmatched.get(tag, 0) + 1
+                else:
+                    node_questions.setdefault(node, []).append(position)
+        self.positions = {node: np.unique(np.array(p, dtype=np.int64)) for node, p in node_questions.items()}
+        self._accuracy: tuple | None = None
+
+    def questions(self, name: str) -> list[int]:
+        """Ids of the questions testing ``name``."""
+        node = self.graph.index.get(name)
+        if node is None or node not in self.positions:
+            return []
+        return self.question_ids[self.positions[node]].tolist()
+
+    def products(self) -> list[tuple[str, int]]:
+        """Catalog products with linked questions and their question counts, most tested first."""
+        counts = [(self.graph.names[n], len(p)) for n, p in self.positions.items() if self.graph.is_product(n)]
+        return sorted(counts, key=lambda item: (-item[1], item[0]))
+
+    def round_ids(self, name: str, depth: int = 1) -> list[int]:
+        """Ids of the questions testing ``name`` and the graph nodes within ``depth`` hops of it."""
+        nodes = [self.graph.index[n] for n in self.graph.neighborhood(name, depth)]
+        parts = [self.positions[n] for n in nodes if n in self.positions]
+        if not parts:
+            return []
+        return self.question_ids[np.unique(np.concatenate(parts))].tolist()
+
+    def accuracy(self, progress: dict[int, bool], version=None) -> "pd.DataFrame":
+        """Questions, answered, correct and accuracy per linked node; cached per progress ``version``."""
+        import pandas as pd
+
+        if version is not None and self._accuracy is not None and self._accuracy[0] == version:
+            return self._accuracy[1]
+        ids = self.question_ids.tolist()
+        answered = np.array([question_id in progress for question_id in ids], dtype=bool)
+        correct = np.array([progress.get(question_id, False) for question_id in ids], dtype=bool)
+        nodes = sorted(self.positions, key=lambda n: self.graph.names[n])
+        counts = np.array(
+            [(len(p), answered[p].sum(), correct[p].sum()) for p in (self.positions[n] for n in nodes)],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        df = pd.DataFrame(
+            {
+                "product": [self.graph.names[n] for n in nodes],
+                "is_product": [self.graph.is_product(n) for n in nodes],
+                "questions": counts[:, 0],
+                "answered": counts[:, 1],
+                "correct": counts[:, 2],
+            }
+        )
+        df["accuracy"] = (df["correct"] / df["answered"].where(df["answered"] > 0) * 100).round(1)
+        if version is not None:
+            self._accuracy = (version, df)
+        return df
+
+
+_graphs: dict[Path, ProductGraph] = {}
+_links: dict[tuple[Path, Path], QuestionLinks] = {}  # by (catalog, question bank) path
+_html: OrderedDict[tuple, str] = OrderedDict()
+_lock = threading.Lock()
+
+
+def read_products(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def get_product_graph(path: Path) -> ProductGraph:
+    """Shared graph of the product catalog at ``path``, rebuilt when the file changes."""
+    version = file_version(path)
+    graph = _graphs.get(path)
+    if graph is not None and graph.version == version:
+        return graph
+    with _lock:
+        graph = _graphs.get(path)
+        if graph is None or graph.version != version:
+            graph = ProductGraph(to_rows(read_products(path)), version)
+            _graphs[path] = graph
+    return graph
+
+
+def get_question_links(path: Path, bank: QuestionBank) -> QuestionLinks:
+    """Shared question cross-index of the catalog at ``path``, rebuilt when either side changes."""
+    graph = get_product_graph(path)
+    key = (path, bank.path)
+    links = _links.get(key)
+    if links is not None and links.version == (graph.version, bank.version):
+        return links
+    with _lock:
+        links = _links.get(key)
+        if links is None or links.version != (graph.version, bank.version):
+            links = QuestionLinks(graph, bank)
+            _links[key] = links
+    return links
+
+
+def graph_html(path: Path, selected: str | None = None, depth: int = 1) -> str:
+    """Rendered PyVis HTML for ``(selected, depth)``, cached across sessions."""
+    graph = get_product_graph(path)
+    key = (path, graph.version, selected, depth if selected else 0)
+    with _lock:
+        html = _html.get(key)
+        if html is not None:
+            _html.move_to_end(key)
+            return html
+    html = graph.render_html(selected, depth)
+    with _lock:
+        _html[key] = html
+        while len(_html) > HTML_CACHE_SIZE:
+            _html.popitem(last=False)
+    return html
+
+
+def invalidate(bank_path: Path | None = None):
+    """Drop everything cached, or only the question links of the bank at ``bank_path``."""
+    with _lock:
+        if bank_path is not None:
+            for key in [key for key in _links if key[1] == bank_path]:
+                del _links[key]
+            return
+        _graphs.clear()
+        _links.clear()
+        _html.clear()
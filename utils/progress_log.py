@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from models.progress import AnswerEvent
+from utils.fileio import atomic_write_text, locked
+
+logger = logging.getLogger(__name__)
+
+# compact the log into the snapshot once it grows beyond this many bytes
+COMPACT_THRESHOLD = 256 * 1024
+
+
+def history_dir(log_file: Path) -> Path:
+    return log_file.with_name(log_file.stem + ".history")
+
+
+def read_snapshot(snapshot_file: Path) -> dict[int, bool]:
+    if not snapshot_file.exists():
+        return {}
+    try:
+        with snapshot_file.open("r", encoding="utf-8") as f:
+            progress = json.load(f)
+        return {int(k): v for k, v in progress.items()}
+    except Exception as e:
+        logger.error(f"Failed to read progress snapshot {snapshot_file}: {e}")
+        return {}
+
+
+def read_events(log_file: Path) -> Iterable[AnswerEvent]:
+    if not log_file.exists():
+        return
+    with log_file.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield AnswerEvent.model_validate_json(line)
+            except Exception as e:
+                # a crash in the middle of an append leaves at most one partial line
+                logger.warning(f"Skipping malformed progress event: {e}")
+
+
+def read_progress(snapshot_file: Path, log_file: Path) -> dict[int, bool]:
+    """Rebuild the latest result per question from the snapshot plus the log tail."""
+    progress = read_snapshot(snapshot_file)
+    for event in read_events(log_file):
+        progress[event.id] = event.correct
+    return progress
+
+
+def append_events(snapshot_file: Path, log_file: Path, events: Iterable[AnswerEvent]):
+    lines = "".join(event.model_dump_json() + "\n" for event in events)
+    if not lines:
+        return
+    with locked(log_file):
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        with log_file.open("a", encoding="utf-8") as f:
+            f.write(lines)
+        if log_file.stat().st_size >= COMPACT_THRESHOLD:
+            _compact(snapshot_file, log_file)
+
+
+def compact(snapshot_file: Path, log_file: Path):
+    with locked(log_file):
+        _compact(snapshot_file, log_file)
+
+
+def _compact(snapshot_file: Path, log_file: Path):
+    # Snapshot first, then rotate the log into the history directory. Replaying a log
+    # that is already folded into the snapshot is idempotent, so a crash in between is safe.
+    if not log_file.exists():
+        return
+    progress = read_progress(snapshot_file, log_file)
+    atomic_write_text(snapshot_file, json.dumps({str(k): v for k, v in progress.items()}, ensure_ascii=False))
+    history = history_dir(log_file)
+    history.mkdir(parents=True, exist_ok=True)
+    os.replace(log_file, history / f"{time.time_ns()}.jsonl")
+    logger.info(f"Compacted progress log into {snapshot_file}")
+
+
+def read_history(log_file: Path) -> Iterable[AnswerEvent]:
+    """All recorded answer events, oldest first, including the compacted ones."""
+    history = history_dir(log_file)
+    if history.exists():
+        for segment in sorted(history.glob("*.jsonl"), key=lambda p: int(p.stem)):
+            yield from read_events(segment)
+    yield from read_events(log_file)
+
+
+def read_answer_history(snapshot_file: Path, log_file: Path) -> list[AnswerEvent]:
+    """Answer history including progress that only exists in a legacy snapshot.
+
+    Snapshot entries never seen in the log are reported as answered at the snapshot's mtime.
+    """
+    events = list(read_history(log_file))
+    seen = {event.id for event in events}
+    legacy = {k: v for k, v in read_snapshot(snapshot_file).items() if k not in seen}
+    if legacy:
+        ts = snapshot_file.stat().st_mtime
+        events[:0] = [AnswerEvent(id=k, correct=v, ts=ts) for k, v in legacy.items()]
+    return events
+
+
+def remove_progress(snapshot_file: Path, log_file: Path):
+    with locked(log_file):
+        snapshot_file.unlink(missing_ok=True)
+        log_file.unlink(missing_ok=True)
+        history = history_dir(log_file)
+        if history.exists():
+            for segment in history.glob("*.jsonl"):
+                segment.unlink()
+            history.rmdir()
@@ -0,0 +1,209 @@
+"""Related questions: nearest neighbours by TF-IDF similarity of question and explanation text.
+
+Every question becomes a sparse TF-IDF vector of its words and word pairs (sublinear
+term frequency, smoothed idf, unit length); terms found in a single question or in more
+than ``MAX_DF`` of them are left out, since they link nothing or everything. The
+``NEIGHBORS`` most similar questions of every question are computed once per bank
+version, by summing products over the term postings, and kept next to the
+bank in ``quizzes.related.npz``, so a lookup is an array slice and fast enough to run
+on every rerun. Nothing leaves the machine; there is no embedding model.
+"""
+
+import itertools
+import json
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from utils.fileio import atomic_writer
+from utils.repository import QuestionBank
+from utils.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+NEIGHBORS = 20  # neighbours kept per question
+MIN_DF = 2
+MAX_DF = 0.2  # share of the questions
+# terms of the neighbours query of each question, by weight; rarer terms decide similarity anyway
+QUERY_TERMS = 32
+# postings scored at once
+CHUNK_HITS = 4_000_000
+
+
+def document_words(record: dict) -> list[str]:
+    return tokenize((record.get("question") or "") + "\n" + (record.get("explanation") or ""))
+
+
+def tfidf(records: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Unit TF-IDF vectors of ``records`` as COO arrays ``(doc, term, weight)``, sorted by doc.
+
+    Terms are the words and adjacent word pairs of each record; pairs are numbered from
+    the ids of their two words, so only single words go through a dictionary.
+    """
+    n = len(records)
+    words = [document_words(r) for r in records]
+    flat = list(itertools.chain.from_iterable(words))
+    # the first occurrence of a word keeps its running number, the ids are made dense below
+    vocabulary: dict[str, int] = {}
+    ids = np.fromiter(map(vocabulary.setdefault, flat, itertools.count()), dtype=np.int64, count=len(flat))
+    _, ids = np.unique(ids, return_inverse=True)
+    n_words = len(vocabulary)
+    docs = np.repeat(np.arange(n, dtype=np.int64), [len(w) for w in words])
+    same = docs[1:] == docs[:-1]
+    terms = np.concatenate([ids, n_words + ids[:-1][same] * n_words + ids[1:][same]])
+    docs = np.concatenate([docs, docs[:-1][same]])
+
+    terms, term_ids = np.unique(terms, return_inverse=True)
+    keys, tf = np.unique(docs * len(terms) + term_ids, return_counts=True)
+    docs, terms = np.divmod(keys, max(1, len(terms)))
+    df = np.bincount(terms)
+    keep = (df[terms] >= MIN_DF) & (df[terms] <= max(MIN_DF, MAX_DF * n))
+    docs, terms, tf = docs[keep], terms[keep], tf[keep]
+    weights = (1 + np.log(tf)) * (np.log((1 + n) / (1 + df[terms])) + 1)
+    norms = np.sqrt(np.bincount(docs, weights=weights * weights, minlength=n))
+    return docs, terms, weights / norms[docs]
+
+
+def nearest(docs: np.ndarray, terms: np.ndarray, weights: np.ndarray, n: int, k: int = NEIGHBORS):
+    """The ``k`` most similar documents of every document, as ``(n, k)`` positions (-1 for none) and scores.
+
+    Each document is scored against the postings of its ``QUERY_TERMS`` heaviest terms;
+    the products are summed per document pair by sorting, ``CHUNK_HITS`` at a time.
+    """
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if not len(docs):
+        return neighbors, scores
+    # postings: documents and weights of every term
+    order = np.argsort(terms, kind="stable")
+    post_docs, post_weights = docs[order], weights[order]
+    post_ptr = np.zeros(terms.max() + 2, dtype=np.int64)
+    np.cumsum(np.bincount(terms), out=post_ptr[1:])
+    # queries: the heaviest terms of every document
+    order = np.lexsort((-weights, docs))
+    starts = np.searchsorted(docs[order], np.arange(n))
+    rank = np.arange(len(order)) - starts[docs[order]]
+    query = np.sort(order[rank < QUERY_TERMS])
+    q_docs, q_terms, q_weights = docs[query], terms[query], weights[query]
+    lengths = post_ptr[q_terms + 1] - post_ptr[q_terms]
+    hits_before = np.concatenate([[0], np.cumsum(lengths)])
+
+    lo = 0
+    while lo < len(query):
+        # whole documents, about CHUNK_HITS postings
+        hi = int(np.searchsorted(hits_before, hits_before[lo] + CHUNK_HITS, side="right")) - 1
+        hi = int(np.searchsorted(q_docs, q_docs[max(lo, hi - 1)], side="right"))
+        count = lengths[lo:hi]
+        hits = np.repeat(post_ptr[q_terms[lo:hi]] - (hits_before[lo:hi] - hits_before[lo]), count)
+        hits += np.arange(hits_before[hi] - hits_before[lo])
+        pairs = np.repeat(q_docs[lo:hi], count) * n + post_docs[hits]
+        products = np.repeat(q_weights[lo:hi], count) * post_weights[hits]
+        lo = hi
+
+        order = np.argsort(pairs, kind="stable")
+        pairs = pairs[order]
+        first = np.flatnonzero(np.concatenate([[True], pairs[1:] != pairs[:-1]]))
+        pair_scores = np.add.reduceat(products[order], first)
+        source, target = np.divmod(pairs[first], n)
+        other = source != target
+        source, target, pair_scores = source[other], target[other], pair_scores[other]
+
+        order = np.lexsort((-pair_scores, source))
+        source, target, pair_scores = source[order], target[order], pair_scores[order]
+        rank = np.arange(len(source)) - np.searchsorted(source, source)
+        top = rank < k
+        neighbors[source[top], rank[top]] = target[top]
+        scores[source[top], rank[top]] = pair_scores[top]
+    return neighbors, scores
+
+
+class RelatedIndex:
+    """The nearest neighbours of every question of a bank, by question id."""
+
+    def __init__(self, question_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray, version=None):
+        self.question_ids = question_ids
+        self.neighbors = neighbors
+        self.scores = scores
+        self.version = version
+        self.positions = {int(question_id): i for i, question_id in enumerate(question_ids)}
+
+    @classmethod
+    def build(cls, bank: QuestionBank) -> "RelatedIndex":
+        question_ids = np.array([r["id"] for r in bank.records], dtype=np.int64)
+        neighbors, scores = nearest(*tfidf(bank.records), len(bank.records))
+        return cls(question_ids, neighbors, scores, bank.version)
+
+    def related(self, question_id: int, k: int = 5, exclude=()) -> list[tuple[int, float]]:
+        """Up to ``k`` ids of the questions most similar to ``question_id``, with their cosine similarity."""
+        i = self.positions.get(question_id)
+        if i is None:
+            return []
+        found = []
+        for j, score in zip(self.neighbors[i].tolist(), self.scores[i].tolist()):
+            if j < 0 or len(found) == k:
+                break
+            other = int(self.question_ids[j])
+            if other not in exclude:
+                found.append((other, score))
+        return found
+
+    def save(self, path: Path):
+        with atomic_writer(path, "wb") as f:
+            np.savez(
+                f,
+                format=INDEX_FORMAT,
+                version=json.dumps(self.version),
+                question_ids=self.question_ids,
+                neighbors=self.neighbors,
+                scores=self.scores,
+            )
+
+    @classmethod
+    def load(cls, path: Path, version) -> "RelatedIndex | None":
+        """The index stored at ``path`` if it was built for bank ``version``."""
+        try:
+            with np.load(path) as data:
+                if int(data["format"]) != INDEX_FORMAT or str(data["version"]) != json.dumps(version):
+                    return None
+                return cls(data["question_ids"], data["neighbors"], data["scores"], version)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable related questions index {path}: {e}")
+        return None
+
+
+def index_file(bank: QuestionBank) -> Path:
+    return bank.path.with_name(bank.path.stem + ".related.npz")
+
+
+_indexes: dict[Path, RelatedIndex] = {}
+_lock = threading.Lock()
+
+
+def get_related_index(bank: QuestionBank) -> RelatedIndex:
+    """Shared related questions index of ``bank``, loaded from disk or rebuilt when the bank changes."""
+    index = _indexes.get(bank.path)
+    if index is not None and index.version == bank.version:
+        return index
+    with _lock:
+        index = _indexes.get(bank.path)
+        if index is None or index.version != bank.version:
+            index = RelatedIndex.load(index_file(bank), bank.version)
+            if index is None:
+                index = RelatedIndex.build(bank)
+                index.save(index_file(bank))
+                logger.info(f"Built related questions index {index_file(bank)}")
+            _indexes[bank.path] = index
+    return index
+
+
+def invalidate(path: Path | None = None):
+    with _lock:
+        if path is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(path, None)
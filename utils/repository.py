@@ -0,0 +1,309 @@
+import json
+import logging
+import re
+import threading
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from models.questions import Question
+from utils.fileio import atomic_writer, locked
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# fold the edit journal back into the question file once it grows beyond this many bytes
+COMPACT_THRESHOLD = 64 * 1024
+
+
+class EditConflict(Exception):
+    """The question was changed by someone else since the editor loaded it."""
+
+
+class QuestionBank:
+    """Validated, read-only snapshot of a question file.
+
+    Holds the ``Question`` objects together with a columnar DataFrame view of the raw
+    records, so pages can share one parse of the file. Treat both as immutable.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        version: tuple | None,
+        records: list[dict],
+        questions: list[Question],
+        offsets: dict[int, int] | None = None,
+        journal_offset: int = 0,
+    ):
+        self.path = path
+        self.version = version
+        self.records = records
+        self.questions = questions
+        self.by_id = {q.id: q for q in questions}
+        self.positions = {q.id: i for i, q in enumerate(questions)}
+        # byte offset of each question's line in the base file, before journal edits
+        self.offsets = offsets or {}
+        # bytes of the edit journal already applied to this snapshot
+        self.journal_offset = journal_offset
+
+    @cached_property
+    def frame(self) -> "pd.DataFrame":
+        # pandas is only imported by the pages that need tables
+        import pandas as pd
+
+        return pd.DataFrame.from_records(self.records)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def get(self, question_id: int) -> Question | None:
+        return self.by_id.get(question_id)
+
+    def record(self, question_id: int) -> dict | None:
+        position = self.positions.get(question_id)
+        return None if position is None else self.records[position]
+
+
+_banks: dict[Path, QuestionBank] = {}
+_lock = threading.Lock()
+
+
+def file_version(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def edits_file(path: Path) -> Path:
+    return path.with_name(path.stem + ".edits.jsonl")
+
+
+def _parse_line(line: bytes) -> tuple[dict, Question] | None:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+        return record, Question.model_validate(record)
+    except Exception as e:
+        logger.error(f"Failed to parse question line: {e}")
+        return None
+
+
+def _read_edits(path: Path, start: int) -> tuple[list[tuple[dict, Question]], int]:
+    """Parse complete journal lines after byte ``start``; returns them and the new offset."""
+    journal = edits_file(path)
+    edits = []
+    if not journal.exists():
+        return edits, start
+    with journal.open("rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # an append in progress, pick it up on the next refresh
+            start += len(line)
+            parsed = _parse_line(line)
+            if parsed is not None:
+                edits.append(parsed)
+    return edits, start
+
+
+def _apply_edits(bank: QuestionBank, version: tuple) -> QuestionBank:
+    edits, journal_offset = _read_edits(bank.path, bank.journal_offset)
+    records = list(bank.records)
+    questions = list(bank.questions)
+    positions = dict(bank.positions)
+    for record, question in edits:
+        position = positions.get(question.id)
+        if position is None:
+            positions[question.id] = len(records)
+            records.append(record)
+            questions.append(question)
+        else:
+            records[position] = record
+            questions[position] = question
+    return QuestionBank(bank.path, version, records, questions, bank.offsets, journal_offset)
+
+
+def parse_bank(path: Path, version: tuple) -> QuestionBank:
+    records: list[dict] = []
+    questions: list[Question] = []
+    offsets: dict[int, int] = {}
+    if path.exists():
+        with path.open("rb") as f:
+            offset = 0
+            for line in f:
+                parsed = _parse_line(line)
+                if parsed is not None:
+                    record, question = parsed
+                    offsets[question.id] = offset
+                    records.append(record)
+                    questions.append(question)
+                offset += len(line)
+    bank = QuestionBank(path, version, records, questions, offsets)
+    return _apply_edits(bank, version)
+
+
+def get_bank(path: Path) -> QuestionBank:
+    """Return the shared snapshot of ``path``, refreshed only when the file or its edit journal changed."""
+    version = (file_version(path), file_version(edits_file(path)))
+    bank = _banks.get(path)
+    if bank is not None and bank.version == version:
+        return bank
+    with _lock:
+        bank = _banks.get(path)
+        if bank is None or bank.version != version:
+            journal_version = version[1]
+            if (
+                bank is not None
+                and bank.version[0] == version[0]
+                and journal_version is not None
+                and journal_version[1] >= bank.journal_offset
+            ):
+                # only new edits were appended: patch the snapshot instead of re-parsing the file
+                bank = _apply_edits(bank, version)
+            else:
+                bank = parse_bank(path, version)
+                logger.info(f"Loaded {len(bank)} questions from {path}")
+            _banks[path] = bank
+    return bank
+
+
+_ID_RE = re.compile(rb'^\s*\{\s*"id"\s*:\s*(-?\d+)')
+
+
+class QuestionIndex:
+    """Byte-offset index of a question file and its edit journal.
+
+    Building it only scans for the leading ``"id"`` of every line, without JSON parsing or
+    validation; question bodies are read on demand by seeking to their line and kept in a
+    small LRU. Rounds use this so they never need the whole bank in memory.
+    """
+
+    def __init__(self, path: Path, version: tuple):
+        self.path = path
+        self.version = version
+        # question id -> (file, byte offset); journal entries override the base file
+        self.locations: dict[int, tuple[Path, int]] = {}
+        for source in (path, edits_file(path)):
+            if not source.exists():
+                continue
+            with source.open("rb") as f:
+                offset = 0
+                for line in f:
+                    if line.endswith(b"\n") or source == path:
+                        question_id = _line_id(line)
+                        if question_id is not None:
+                            self.locations[question_id] = (source, offset)
+                    offset += len(line)
+        self.read = lru_cache(maxsize=128)(self._read)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __contains__(self, question_id: int):
+        return question_id in self.locations
+
+    def _read(self, question_id: int) -> Question | None:
+        location = self.locations.get(question_id)
+        if location is None:
+            return None
+        source, offset = location
+        with source.open("rb") as f:
+            f.seek(offset)
+            parsed = _parse_line(f.readline())
+        return None if parsed is None else parsed[1]
+
+
+def _line_id(line: bytes) -> int | None:
+    match = _ID_RE.match(line)
+    if match:
+        return int(match.group(1))
+    try:
+        return int(json.loads(line)["id"])
+    except Exception:
+        return None
+
+
+_indexes: dict[Path, QuestionIndex] = {}
+
+
+def get_index(path: Path) -> QuestionIndex:
+    """Shared offset index of ``path``, rebuilt when the file or its edit journal changed."""
+    version = (file_version(path), file_version(edits_file(path)))
+    index = _indexes.get(path)
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        index = _indexes.get(path)
+        if index is None or index.version != version:
+            index = QuestionIndex(path, version)
+            _indexes[path] = index
+    return index
+
+
+def save_record(path: Path, record: dict, original: dict | None = None):
+    """Persist one edited question record by appending it to the edit journal.
+
+    ``original`` is the record as the editor loaded it; if the stored record differs
+    from it, someone else saved in between and ``EditConflict`` is raised.
+    """
+    Question.model_validate(record)
+    journal = edits_file(path)
+    with locked(journal):
+        current = get_bank(path).record(record["id"])
+        if original is not None and current != original:
+            raise EditConflict(f"Question {record['id']} was changed by someone else")
+        with journal.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        if journal.stat().st_size >= COMPACT_THRESHOLD:
+            _compact(path)
+
+
+def compact(path: Path):
+    with locked(edits_file(path)):
+        _compact(path)
+
+
+def _compact(path: Path):
+    # Unchanged lines are copied byte for byte, only edited records are re-serialized.
+    # The journal is removed after the atomic replace; re-applying it is harmless.
+    journal = edits_file(path)
+    if not journal.exists():
+        return
+    bank = get_bank(path)
+    edited: dict[int, dict] = {}
+    for record, question in _read_edits(path, 0)[0]:
+        edited[question.id] = bank.record(question.id) or record
+    by_offset = {offset: question_id for question_id, offset in bank.offsets.items()}
+    with atomic_writer(path, "wb") as out:
+        if path.exists():
+            with path.open("rb") as f:
+                offset = 0
+                for line in f:
+                    question_id = by_offset.get(offset)
+                    offset += len(line)
+                    if question_id in edited:
+                        line = (json.dumps(edited.pop(question_id)) + "\n").encode("utf-8")
+                    elif not line.endswith(b"\n"):
+                        line += b"\n"
+                    out.write(line)
+        for record in edited.values():
+            out.write((json.dumps(record) + "\n").encode("utf-8"))
+    journal.unlink()
+    logger.info(f"Compacted question edits into {path}")
+
+
+def invalidate(path: Path | None = None):
+    with _lock:
+        if path is None:
+            _banks.clear()
+            _indexes.clear()
+        else:
+            _banks.pop(path, None)
+            _indexes.pop(path, None)
@@ -0,0 +1,118 @@
+import heapq
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterable
+
+from models.progress import AnswerEvent, ReviewState
+
+DAY = 24 * 3600
+
+# SM-2 answer quality for a correct / wrong answer (0..5 scale)
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+MIN_EASE = 1.3
+
+
+def review(state: ReviewState, correct: bool, ts: float) -> ReviewState:
+    """Return the SM-2 state after answering a question at ``ts``."""
+    quality = QUALITY_CORRECT if correct else QUALITY_WRONG
+    if quality < 3:
+        reps, lapses, interval = 0, state.lapses + 1, 1.0
+    else:
+        reps, lapses = state.reps + 1, state.lapses
+        if reps == 1:
+            interval = 1.0
+        elif reps == 2:
+            interval = 6.0
+        else:
+            interval = round(state.interval * state.ease)
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ReviewState(ease=ease, interval=interval, reps=reps, lapses=lapses, due=ts + interval * DAY)
+
+
+class Scheduler:
+    """Review state per answered question and a due-date heap over it.
+
+    The heap uses lazy deletion: every update pushes a new ``(due, id)`` entry and
+    entries whose due date no longer matches the state are dropped when reached, so
+    picking the next ``n`` due questions costs O(n log Q) instead of a full scan.
+    """
+
+    def __init__(self, events: Iterable[AnswerEvent] = ()):
+        self.states: dict[int, ReviewState] = {}
+        self._heap: list[tuple[float, int]] = []
+        self._lock = threading.Lock()
+        for event in events:
+            self._heap.append((self._review(event).due, event.id))
+        heapq.heapify(self._heap)
+
+    def _review(self, event: AnswerEvent) -> ReviewState:
+        state = review(self.states.get(event.id, ReviewState()), event.correct, event.ts)
+        self.states[event.id] = state
+        return state
+
+    def record(self, events: Iterable[AnswerEvent]):
+        with self._lock:
+            for event in events:
+                heapq.heappush(self._heap, (self._review(event).due, event.id))
+
+    def due(self, n: int, now: float | None = None) -> list[int]:
+        """Ids of up to ``n`` questions due at ``now``, most overdue first."""
+        now = time.time() if now is None else now
+        picked: list[tuple[float, int]] = []
+        seen: set[int] = set()
+        with self._lock:
+            while self._heap and len(picked) < n and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                state = self.states.get(entry[1])
+                if state is not None and state.due == entry[0] and entry[1] not in seen:
+                    seen.add(entry[1])
+                    picked.append(entry)
+            for entry in picked:
+                heapq.heappush(self._heap, entry)
+            self._maybe_rebuild()
+        return [question_id for _, question_id in picked]
+
+    def count_due(self, now: float | None = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            return sum(1 for state in self.states.values() if state.due <= now)
+
+    def _maybe_rebuild(self):
+        # keep stale entries from piling up after many updates
+        if len(self._heap) > 2 * len(self.states) + 64:
+            self._heap = [(state.due, question_id) for question_id, state in self.states.items()]
+            heapq.heapify(self._heap)
+
+
+_schedulers: dict[Hashable, tuple[Hashable, Scheduler]] = {}
+_lock = threading.Lock()
+
+
+def get_scheduler(key: Hashable, version: Hashable, load_events: Callable[[], Iterable[AnswerEvent]]) -> Scheduler:
+    """Shared scheduler for ``key``, replayed from the answer history when ``version`` changes."""
+    with _lock:
+        cached = _schedulers.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        scheduler = Scheduler(load_events())
+        _schedulers[key] = (version, scheduler)
+        return scheduler
+
+
+def record(key: Hashable, version: Hashable, events: list[AnswerEvent]):
+    """Apply answers this process just stored to the cached scheduler and adopt the new ``version``."""
+    with _lock:
+        cached = _schedulers.get(key)
+        if cached is None:
+            return
+        cached[1].record(events)
+        _schedulers[key] = (version, cached[1])
+
+
+def invalidate(key: Hashable | None = None):
+    with _lock:
+        if key is None:
+            _schedulers.clear()
+        else:
+            _schedulers.pop(key, None)
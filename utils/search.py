@@ -0,0 +1,150 @@
+import bisect
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from utils.fileio import atomic_write_text
+from utils.repository import QuestionBank
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+# how many index terms a query prefix may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from has have how if in into is it its of on or should that the "
+    "their them then there these this to was what when which while will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(_TAG_RE.sub(" ", text.lower())) if t not in STOPWORDS]
+
+
+def document_text(record: dict) -> str:
+    return "\n".join([record.get("question") or "", *(record.get("options") or []), record.get("explanation") or ""])
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class SearchIndex:
+    """BM25 inverted index over question, options and explanation text.
+
+    ``docs`` maps question id to ``{"hash", "len", "tf"}`` and is what gets persisted;
+    the postings and the sorted term list used for prefix matching are derived from it.
+    """
+
+    def __init__(self, docs: dict[int, dict] | None = None):
+        self.docs: dict[int, dict] = docs or {}
+        self._build_postings()
+
+    def _build_postings(self):
+        self.postings: dict[str, dict[int, int]] = {}
+        for question_id, doc in self.docs.items():
+            for term, tf in doc["tf"].items():
+                self.postings.setdefault(term, {})[question_id] = tf
+        self.terms = sorted(self.postings)
+        total = sum(doc["len"] for doc in self.docs.values())
+        self.avg_len = total / len(self.docs) if self.docs else 0.0
+
+    def update(self, records: list[dict]) -> bool:
+        """Re-index only the records whose text changed; returns whether anything changed."""
+        changed = False
+        seen = set()
+        for record in records:
+            question_id = record["id"]
+            seen.add(question_id)
+            text = document_text(record)
+            digest = _digest(text)
+            doc = self.docs.get(question_id)
+            if doc is not None and doc["hash"] == digest:
+                continue
+            tokens = tokenize(text)
+            self.docs[question_id] = {"hash": digest, "len": len(tokens), "tf": dict(Counter(tokens))}
+            changed = True
+        for question_id in set(self.docs) - seen:
+            del self.docs[question_id]
+            changed = True
+        if changed:
+            self._build_postings()
+        return changed
+
+    def expand(self, token: str) -> list[str]:
+        start = bisect.bisect_left(self.terms, token)
+        end = bisect.bisect_left(self.terms, token + "\uffff", lo=start)
+        return self.terms[start : min(end, start + MAX_PREFIX_EXPANSIONS)]
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[int, float]]:
+        """Ids and BM25 scores of the best matches; every query token also matches as a prefix."""
+        n_docs = len(self.docs)
+        scores: Counter = Counter()
+        for token in dict.fromkeys(tokenize(query)):
+            for term in self.expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                # prefix expansions count a little less than the exact term
+                weight = 1.0 if term == token else 0.5
+                for question_id, tf in postings.items():
+                    norm = K1 * (1 - B + B * self.docs[question_id]["len"] / self.avg_len)
+                    scores[question_id] += weight * idf * tf * (K1 + 1) / (tf + norm)
+        return scores.most_common(limit)
+
+    def to_json(self) -> str:
+        return json.dumps({"format": INDEX_FORMAT, "docs": self.docs})
+
+    @classmethod
+    def from_file(cls, path: Path) -> "SearchIndex":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("format") == INDEX_FORMAT:
+                return cls({int(k): v for k, v in data["docs"].items()})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable search index {path}: {e}")
+        return cls()
+
+
+def index_file(bank: QuestionBank) -> Path:
+    return bank.path.with_name(bank.path.stem + ".search.json")
+
+
+_indexes: dict[Path, tuple[tuple, SearchIndex]] = {}
+_lock = threading.Lock()
+
+
+def get_search_index(bank: QuestionBank) -> SearchIndex:
+    """Shared search index of ``bank``, loaded from disk and brought up to date incrementally."""
+    with _lock:
+        cached = _indexes.get(bank.path)
+        if cached is not None and cached[0] == bank.version:
+            return cached[1]
+        # update a copy so concurrent searches keep a consistent snapshot
+        index = SearchIndex(dict(cached[1].docs)) if cached is not None else SearchIndex.from_file(index_file(bank))
+        if index.update(bank.records):
+            atomic_write_text(index_file(bank), index.to_json())
+            logger.info(f"Updated search index {index_file(bank)}")
+        _indexes[bank.path] = (bank.version, index)
+        return index
+
+
+def invalidate(path: Path | None = None):
+    with _lock:
+        if path is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(path, None)
@@ -1,43 +1,125 @@
+import re
+import uuid
+
 import streamlit as st
 from diskcache import Cache
 
-from models.questions import Question
+from utils import banks, current_bank
+
 
+# diskcache is thread- and process-safe, so all script threads share one handle
 cache = Cache("./cache")
 
+SESSION_PARAM = "session"
+SESSION_TTL = 7 * 24 * 3600  # seconds an idle round is kept on disk
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def session_id() -> str:
+    """Return the id of the current browser session.
+
+    The id lives in ``st.session_state`` and is mirrored in the URL query string, so a
+    reload of the page resumes the same round instead of sharing one global slot.
+    """
+    sid = st.session_state.get("session_id") or st.query_params.get(SESSION_PARAM)
+    if not sid or not _SESSION_ID_RE.match(sid):
+        sid = uuid.uuid4().hex
+    st.session_state.session_id = sid
+    if st.query_params.get(SESSION_PARAM) != sid:
+        st.query_params[SESSION_PARAM] = sid
+    return sid
+
+
+def _bank_prefix(sid: str) -> str:
+    # rounds are kept per question bank; the default bank keeps the original keys
+    name = current_bank().name
+    return sid if name == banks.DEFAULT_BANK else f"{sid}:{name}"
+
+
+def _round_key(sid: str) -> str:
+    return f"{_bank_prefix(sid)}:round"
+
+
+def _state_key(sid: str) -> str:
+    return f"{_bank_prefix(sid)}:state"
+
+
+def _exam_key(sid: str) -> str:
+    return f"{_bank_prefix(sid)}:exam"
+
 
 def load_session():
+    """Set up the round state of this session; the cached round is only read once per session and bank."""
     if "message" in st.session_state:
         st.info(st.session_state.message)
         del st.session_state.message
     st.session_state.setdefault("quiz_in_progress", None)
     st.session_state.setdefault("quiz_mode_pos", 0)
     st.session_state.setdefault("quiz_mode_round_progress", {})
+    st.session_state.setdefault("quiz_mode_round_answers", {})
     st.session_state.setdefault("quiz_mode_answered", False)
     st.session_state.setdefault("wrong_answered_inclusion", False)
-    st.session_state.setdefault("quizzes", [])
+    st.session_state.setdefault("quiz_round_ids", [])
+
+    sid = session_id()
+    bank = current_bank().name
+    if st.session_state.get("session_hydrated") == bank:
+        return
+    st.session_state.session_hydrated = bank
+    question_ids = cache.get(_round_key(sid))
+    if question_ids:
+        state = cache.get(_state_key(sid), {})
+        st.session_state.quiz_in_progress = True
+        st.session_state.quiz_round_ids = question_ids
+        st.session_state.quiz_mode_pos = state.get("pos", 0)
+        st.session_state.quiz_mode_round_progress = state.get("progress", {})
+        st.session_state.quiz_mode_round_answers = state.get("answers", {})
 
-    if cache.get("quiz_in_progress", False):
-        st.session_state.quiz_in_progress = cache.get("quiz_in_progress", False)
-        st.session_state.quizzes = [Question.model_validate(d) for d in cache.get("quizzes", [])]
-        st.session_state.quiz_mode_pos = cache.get("quiz_mode_pos", 0)
-        st.session_state.quiz_mode_round_progress = cache.get("quiz_mode_round_progress", {})
+
+def cache_round():
+    """Persist a freshly started round: the question ids once, plus the initial state."""
+    sid = session_id()
+    with cache.transact():
+        cache.set(_round_key(sid), st.session_state.quiz_round_ids, expire=SESSION_TTL)
+        cache_session()
 
 
 def cache_session():
-    cache.set("quiz_in_progress", st.session_state.quiz_in_progress)
+    """Persist the per-click round state (position, results and choices) of the current session."""
+    sid = session_id()
     if st.session_state.quiz_in_progress:
-        cache.set("quizzes", [q.model_dump() for q in st.session_state.quizzes])
-        cache.set("quiz_mode_pos", st.session_state.quiz_mode_pos)
-        cache.set("quiz_mode_round_progress", st.session_state.quiz_mode_round_progress)
+        state = {
+            "pos": st.session_state.quiz_mode_pos,
+            "progress": st.session_state.quiz_mode_round_progress,
+            "answers": st.session_state.quiz_mode_round_answers,
+        }
+        write_state(sid, state)
     else:
-        cache.delete("quizzes")
-        cache.delete("quiz_mode_pos")
-        cache.delete("quiz_mode_round_progress")
+        clear_session_cache()
+
+
+def write_state(sid: str, state: dict):
+    cache.set(_state_key(sid), state, expire=SESSION_TTL)
+    cache.touch(_round_key(sid), expire=SESSION_TTL)
 
 
 def clear_session_cache():
-    cache.delete("quiz_in_progress")
-    cache.delete("quizzes")
-    cache.delete("quiz_mode_pos")
-    cache.delete("quiz_mode_round_progress")
+    sid = session_id()
+    with cache.transact():
+        cache.delete(_round_key(sid))
+        cache.delete(_state_key(sid))
+
+
+def load_exam() -> dict | None:
+    """The mock exam of this session, restored from disk after a reload."""
+    if "exam" not in st.session_state:
+        st.session_state.exam = cache.get(_exam_key(session_id()))
+    return st.session_state.exam
+
+
+def cache_exam():
+    sid = session_id()
+    if st.session_state.get("exam"):
+        cache.set(_exam_key(sid), st.session_state.exam, expire=SESSION_TTL)
+    else:
+        cache.delete(_exam_key(sid))
@@ -0,0 +1,351 @@
+"""Optional SQLite storage for questions and progress.
+
+Enable it with ``QUIZ_STORAGE=sqlite`` (database path in ``QUIZ_DB``, default
+``data/quiz.db``). Convert from and to the JSONL files with::
+
+    python -m utils.sqlite_store import data/quiz.db --quizzes data/quizzes.jsonl --progress data/progress.json
+    python -m utils.sqlite_store export data/quiz.db --quizzes data/quizzes.jsonl
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from models.progress import AnswerEvent
+from models.questions import TAG_FIELDS, Question
+from utils.fileio import atomic_write_text
+from utils.progress_log import read_events, read_snapshot
+from utils.repository import EditConflict, QuestionBank
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    explanation TEXT
+);
+CREATE TABLE IF NOT EXISTS options (
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (question_id, idx)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (question_id, field, position)
+);
+CREATE INDEX IF NOT EXISTS tags_field_tag ON tags (field, tag, question_id);
+CREATE TABLE IF NOT EXISTS answers (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    choice TEXT NOT NULL,
+    elapsed REAL
+);
+CREATE INDEX IF NOT EXISTS answers_question ON answers (question_id);
+CREATE TABLE IF NOT EXISTS progress (
+    question_id INTEGER PRIMARY KEY,
+    correct INTEGER NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+_banks: dict[Path, QuestionBank] = {}
+_initialized: set[tuple[Path, tuple[int, int]]] = set()
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def _file_id(db_file: Path) -> tuple[int, int] | None:
+    try:
+        stat = db_file.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def connect(db_file: Path) -> sqlite3.Connection:
+    """Connection to ``db_file`` shared by the calling thread.
+
+    The schema is created the first time a database file is opened; a file that
+    was deleted or replaced since the last call gets a fresh connection.
+    """
+    conns: dict[Path, tuple[tuple[int, int], sqlite3.Connection]] = _local.__dict__.setdefault("conns", {})
+    cached = conns.pop(db_file, None)
+    if cached is not None:
+        if cached[0] == _file_id(db_file):
+            conns[db_file] = cached
+            return cached[1]
+        cached[1].close()
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_file, timeout=30)
+    conn.execute("PRAGMA foreign_keys=ON")
+    file_id = _file_id(db_file)
+    if (db_file, file_id) not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', ?)", (uuid4().hex,))
+        with _lock:
+            _initialized.add((db_file, file_id))
+    conns[db_file] = (file_id, conn)
+    return conn
+
+
+def questions_version(conn: sqlite3.Connection) -> tuple[str, int]:
+    """Version of the questions: the database's generation id and its edit counter.
+
+    The generation is written once when the database is created, so a re-created
+    database never matches a bank cached from the old one.
+    """
+    meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('generation', 'questions_version')"))
+    return meta.get("generation", ""), int(meta.get("questions_version", 0))
+
+
+def _bump_questions_version(conn: sqlite3.Connection):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('questions_version', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
+
+def write_questions(conn: sqlite3.Connection, records: Iterable[dict], replace: bool = False):
+    """Insert or update question records (the JSONL dicts) with their options and tags."""
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM questions")
+        start = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM questions").fetchone()[0]
+        for offset, record in enumerate(records):
+            question = Question.model_validate(record)
+            existing = conn.execute("SELECT position FROM questions WHERE id = ?", (question.id,)).fetchone()
+            position = existing[0] if existing else start + offset
+            conn.execute("DELETE FROM questions WHERE id = ?", (question.id,))
+            conn.execute(
+                "INSERT INTO questions (id, position, mode, question, answer, explanation) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    question.id,
+                    position,
+                    question.mode,
+                    question.question,
+                    json.dumps(question.answer),
+                    question.explanation,
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO options (question_id, idx, text) VALUES (?, ?, ?)",
+                [(question.id, idx, text) for idx, text in enumerate(question.options)],
+            )
+            conn.executemany(
+                "INSERT INTO tags (question_id, field, position, tag) VALUES (?, ?, ?, ?)",
+                [
+                    (question.id, field, idx, tag)
+                    for field in TAG_FIELDS
+                    for idx, tag in enumerate(getattr(question, field))
+                ],
+            )
+        _bump_questions_version(conn)
+
+
+def save_record(db_file: Path, record: dict, original: dict | None = None):
+    conn = connect(db_file)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = next(iter(read_records(conn, record["id"])), None)
+        if original is not None and current != original:
+            raise EditConflict(f"Question {record['id']} was changed by someone else")
+        write_questions(conn, [record])
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def read_records(conn: sqlite3.Connection, question_id: int | None = None) -> list[dict]:
+    where, params = ("WHERE {} = ?", (question_id,)) if question_id is not None else ("", ())
+    records = {
+        row[0]: {
+            "id": row[0],
+            "mode": row[1],
+            "question": row[2],
+            "options": [],
+            "answer": json.loads(row[3]),
+            "explanation": row[4],
+            **{field: [] for field in TAG_FIELDS},
+        }
+        for row in conn.execute(
+            f"SELECT id, mode, question, answer, explanation FROM questions {where.format('id')} ORDER BY position",
+            params,
+        )
+    }
+    for qid, text in conn.execute(
+        f"SELECT question_id, text FROM options {where.format('question_id')} ORDER BY question_id, idx", params
+    ):
+        records[qid]["options"].append(text)
+    for qid, field, tag in conn.execute(
+        f"SELECT question_id, field, tag FROM tags {where.format('question_id')} ORDER BY question_id, field, position",
+        params,
+    ):
+        records[qid][field].append(tag)
+    return list(records.values())
+
+
+def get_bank(db_file: Path) -> QuestionBank:
+    """Shared QuestionBank for ``db_file``; rebuilt only when the questions change."""
+    conn = connect(db_file)
+    version = questions_version(conn)
+    bank = _banks.get(db_file)
+    if bank is not None and bank.version == version:
+        return bank
+    with _lock:
+        bank = _banks.get(db_file)
+        if bank is None or bank.version != version:
+            records = read_records(conn)
+            bank = QuestionBank(db_file, version, records, [Question.model_validate(r) for r in records])
+            _banks[db_file] = bank
+    return bank
+
+
+def invalidate(db_file: Path | None = None):
+    with _lock:
+        if db_file is None:
+            _banks.clear()
+        else:
+            _banks.pop(db_file, None)
+
+
+def read_question(db_file: Path, question_id: int) -> Question | None:
+    conn = connect(db_file)
+    records = read_records(conn, question_id)
+    return Question.model_validate(records[0]) if records else None
+
+
+def load_progress(db_file: Path) -> dict[int, bool]:
+    conn = connect(db_file)
+    return {qid: bool(correct) for qid, correct in conn.execute("SELECT question_id, correct FROM progress")}
+
+
+def record_answers(db_file: Path, events: Iterable[AnswerEvent]):
+    rows = [(e.id, int(e.correct), e.ts, json.dumps(e.choice), e.elapsed) for e in events]
+    with connect(db_file) as conn:
+        conn.executemany(
+            "INSERT INTO answers (question_id, correct, ts, choice, elapsed) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.executemany(
+            "INSERT INTO progress (question_id, correct, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT(question_id) DO UPDATE SET correct = excluded.correct, last_seen = excluded.last_seen",
+            [(qid, correct, ts) for qid, correct, ts, _, _ in rows],
+        )
+
+
+def read_history(db_file: Path) -> list[AnswerEvent]:
+    conn = connect(db_file)
+    return [
+        AnswerEvent(id=qid, correct=bool(correct), ts=ts, choice=json.loads(choice), elapsed=elapsed)
+        for qid, correct, ts, choice, elapsed in conn.execute(
+            "SELECT question_id, correct, ts, choice, elapsed FROM answers ORDER BY seq"
+        )
+    ]
+
+
+def progress_version(db_file: Path) -> tuple:
+    conn = connect(db_file)
+    return conn.execute("SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM answers").fetchone()
+
+
+def reset_progress(db_file: Path):
+    with connect(db_file) as conn:
+        conn.execute("DELETE FROM answers")
+        conn.execute("DELETE FROM progress")
+
+
+def topic_distribution(db_file: Path, topic_field: str) -> "pd.DataFrame":
+    import pandas as pd
+
+    conn = connect(db_file)
+    return pd.read_sql_query(
+        "SELECT tag AS topic, COUNT(*) AS count FROM tags WHERE field = ? GROUP BY tag ORDER BY count DESC",
+        conn,
+        params=(topic_field,),
+    )
+
+
+def topic_stats(db_file: Path, topic_field: str) -> "pd.DataFrame":
+    import pandas as pd
+
+    conn = connect(db_file)
+    return pd.read_sql_query(
+        "SELECT t.tag AS topic, COUNT(*) AS attempts, SUM(p.correct) AS correct, "
+        "AVG(p.correct) AS accuracy, MAX(p.last_seen) AS last_seen "
+        "FROM tags t JOIN progress p ON p.question_id = t.question_id "
+        "WHERE t.field = ? GROUP BY t.tag",
+        conn,
+        params=(topic_field,),
+    )
+
+
+def import_jsonl(db_file: Path, quiz_file: Path, progress_file: Path | None = None, progress_log: Path | None = None):
+    with quiz_file.open("r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    conn = connect(db_file)
+    write_questions(conn, records, replace=True)
+    if progress_file is not None or progress_log is not None:
+        reset_progress(db_file)
+        events = []
+        if progress_file is not None and progress_file.exists():
+            snapshot_ts = progress_file.stat().st_mtime
+            events.extend(AnswerEvent(id=k, correct=v, ts=snapshot_ts) for k, v in read_snapshot(progress_file).items())
+        if progress_log is not None:
+            events.extend(read_events(progress_log))
+        record_answers(db_file, events)
+    logger.info(f"Imported {len(records)} questions into {db_file}")
+
+
+def export_jsonl(db_file: Path, quiz_file: Path):
+    conn = connect(db_file)
+    records = read_records(conn)
+    atomic_write_text(quiz_file, "".join(json.dumps(r) + "\n" for r in records))
+    logger.info(f"Exported {len(records)} questions to {quiz_file}")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Convert between the JSONL files and the SQLite store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="load quizzes.jsonl (and optionally progress) into the database")
+    imp.add_argument("db", type=Path)
+    imp.add_argument("--quizzes", type=Path, default=Path("data/quizzes.jsonl"))
+    imp.add_argument("--progress", type=Path, help="progress.json snapshot to import")
+    imp.add_argument("--progress-log", type=Path, help="progress.log.jsonl events to import after the snapshot")
+    exp = sub.add_parser("export", help="write the database questions back to a JSONL file")
+    exp.add_argument("db", type=Path)
+    exp.add_argument("--quizzes", type=Path, default=Path("data/quizzes.jsonl"))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "import":
+        import_jsonl(args.db, args.quizzes, args.progress, args.progress_log)
+    else:
+        export_jsonl(args.db, args.quizzes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import atexit
+import heapq
+import logging
+import statistics
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from models.progress import TelemetryEvent
+from models.questions import Question
+from utils.fileio import locked
+from utils.repository import QuestionBank, file_version
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# flush buffered events once this many are pending or the oldest is this old
+BATCH_SIZE = 50
+MAX_DELAY = 30.0
+# a wrong option picked by at least this share of all answers hints at a broken answer key
+SUSPECT_SHARE = 0.5
+SUSPECT_MIN_ANSWERS = 5
+
+
+class TelemetryBuffer:
+    """In-memory buffer of telemetry events, appended to a JSONL file in batches.
+
+    ``emit`` never writes; once a batch is due it is handed to a background thread, so
+    clicks in Quiz Mode do not wait on disk. Pending events are also flushed at exit.
+    """
+
+    def __init__(self, path: Path, batch_size: int = BATCH_SIZE, max_delay: float = MAX_DELAY):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._pending: list[TelemetryEvent] = []
+        self._oldest: float | None = None
+        self._lock = threading.Lock()
+        self._flushing = False
+
+    def emit(self, event: TelemetryEvent):
+        with self._lock:
+            self._pending.append(event)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.max_delay
+            if not due or self._flushing:
+                return
+            self._flushing = True
+        threading.Thread(target=self._background_flush, daemon=True).start()
+
+    def _background_flush(self):
+        try:
+            while True:
+                self.flush()
+                with self._lock:
+                    # keep going if another batch filled up while writing
+                    if len(self._pending) < self.batch_size:
+                        break
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def flush(self):
+        with self._lock:
+            events, self._pending, self._oldest = self._pending, [], None
+        if not events:
+            return
+        lines = "".join(event.model_dump_json() + "\n" for event in events)
+        try:
+            with locked(self.path):
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(lines)
+        except OSError as e:
+            logger.error(f"Dropping {len(events)} telemetry events, could not write {self.path}: {e}")
+
+    def pending(self) -> list[TelemetryEvent]:
+        with self._lock:
+            return list(self._pending)
+
+
+_buffers: dict[Path, TelemetryBuffer] = {}
+_lock = threading.Lock()
+
+
+def get_buffer(path: Path) -> TelemetryBuffer:
+    with _lock:
+        buffer = _buffers.get(path)
+        if buffer is None:
+            buffer = _buffers[path] = TelemetryBuffer(path)
+        return buffer
+
+
+def flush_all():
+    with _lock:
+        buffers = list(_buffers.values())
+    for buffer in buffers:
+        buffer.flush()
+
+
+atexit.register(flush_all)
+
+
+def read_events(path: Path) -> Iterable[TelemetryEvent]:
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield TelemetryEvent.model_validate_json(line)
+            except Exception as e:
+                logger.warning(f"Skipping malformed telemetry event: {e}")
+
+
+class TelemetrySummary:
+    """Per-question shown/answered/skipped counts, answer times and wrong-option picks."""
+
+    def __init__(self, events: Iterable[TelemetryEvent]):
+        self.shown: Counter = Counter()
+        self.answered: Counter = Counter()
+        self.wrong: Counter = Counter()
+        self.skipped: Counter = Counter()
+        self.restarts = 0
+        self.elapsed: dict[int, list[float]] = {}
+        # question id -> option index -> times picked in a wrong answer; a multi-select
+        # answer can be wrong with the correct options among its picks, see distractors()
+        self.picks: dict[int, Counter] = {}
+        for event in events:
+            if event.kind == "restart":
+                self.restarts += 1
+            elif event.id is None:
+                continue
+            elif event.kind == "shown":
+                self.shown[event.id] += 1
+            elif event.kind == "skip":
+                self.skipped[event.id] += 1
+            elif event.kind == "answer":
+                self.answered[event.id] += 1
+                if event.elapsed is not None:
+                    self.elapsed.setdefault(event.id, []).append(event.elapsed)
+                if event.correct is False:
+                    self.wrong[event.id] += 1
+                    self.picks.setdefault(event.id, Counter()).update(event.choice)
+
+    def distractors(self, question: Question) -> Counter:
+        """Times each wrong option of ``question`` was picked in a wrong answer."""
+        picks = self.picks.get(question.id)
+        if not picks:
+            return Counter()
+        key = question.answer if isinstance(question.answer, list) else [question.answer]
+        return Counter(
+            {option: count for option, count in picks.items() if option not in key and option < len(question.options)}
+        )
+
+    def hardest(self, bank: QuestionBank, min_answers: int = 3) -> "pd.DataFrame":
+        """Questions answered at least ``min_answers`` times, highest error rate first."""
+        import pandas as pd
+
+        rows = []
+        for question_id, answered in self.answered.items():
+            if answered < min_answers:
+                continue
+            question = bank.get(question_id)
+            top = self.distractors(question).most_common(1) if question is not None else []
+            top_option, top_count = top[0] if top else (None, 0)
+            elapsed = self.elapsed.get(question_id)
+            rows.append(
+                {
+                    "id": question_id,
+                    "question": question.question[:120] if question else "",
+                    "answered": answered,
+                    "error_rate": self.wrong[question_id] / answered,
+                    "skipped": self.skipped[question_id],
+                    "median_seconds": statistics.median(elapsed) if elapsed else None,
+                    "top_distractor": question.options[top_option] if top_option is not None else None,
+                    "suspect_key": answered >= SUSPECT_MIN_ANSWERS and top_count / answered >= SUSPECT_SHARE,
+                }
+            )
+        columns = ["id", "question", "answered", "error_rate", "skipped", "median_seconds", "top_distractor"]
+        df = pd.DataFrame(rows, columns=[*columns, "suspect_key"])
+        return df.sort_values(["error_rate", "answered"], ascending=False, kind="stable").reset_index(drop=True)
+
+    def distractor_frame(self, bank: QuestionBank, limit: int = 50) -> "pd.DataFrame":
+        """Most often chosen wrong options across all questions."""
+        import pandas as pd
+
+        picks = []
+        for question_id in self.picks:
+            question = bank.get(question_id)
+            if question is not None:
+                picks.extend((count, question_id, option) for option, count in self.distractors(question).items())
+        rows = [
+            {
+                "id": question_id,
+                "option": bank.get(question_id).options[option],
+                "times_chosen": count,
+                "share_of_answers": count / self.answered[question_id],
+            }
+            for count, question_id, option in heapq.nlargest(limit, picks)
+        ]
+        return pd.DataFrame(rows, columns=["id", "option", "times_chosen", "share_of_answers"])
+
+
+_summaries: dict[Path, tuple[tuple | None, TelemetrySummary]] = {}
+
+
+def get_summary(path: Path) -> TelemetrySummary:
+    """Summary of everything flushed to ``path`` so far, recomputed when the file grows."""
+    version = file_version(path)
+    with _lock:
+        cached = _summaries.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    summary = TelemetrySummary(read_events(path))
+    with _lock:
+        _summaries[path] = (version, summary)
+    return summary
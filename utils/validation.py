@@ -0,0 +1,319 @@
+"""Structural checks and near-duplicate detection for a question file.
+
+One streaming pass over ``quizzes.jsonl`` checks every line (JSON, schema, unique ids,
+answers within the options, mode matching the answer type) and computes a MinHash
+signature of the question and its options. Near-duplicates are then found with LSH
+banding: only questions sharing a band bucket are compared, so the cost grows with
+the number of likely duplicates rather than with the square of the bank size::
+
+    python -m utils.validation data/quizzes.jsonl --report report.json --merged merged.jsonl
+"""
+
+import argparse
+import json
+import logging
+import re
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from models.questions import TAG_FIELDS, Question
+from utils.fileio import atomic_writer
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3  # words per shingle
+NUM_PERM = 128
+# 32 bands of 4 rows make pairs with a Jaccard similarity around 0.42 collide in half
+# the cases, well below THRESHOLD, so few true duplicates are missed; candidates are
+# verified on their exact shingle sets
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.7
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+_LABEL_RE = re.compile(r"^\s*[A-Ha-h][.)]\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+class Issue(BaseModel):
+    line: int
+    id: int | None = None
+    severity: str  # "error" (the app skips or misgrades it) or "warning"
+    check: str
+    message: str
+
+    def __str__(self):
+        return f"line {self.line}: {self.severity}: {self.message}"
+
+
+class DuplicatePair(BaseModel):
+    first: int  # question ids, first < second
+    second: int
+    similarity: float  # Jaccard similarity of the shingle sets
+    same_answer: bool  # whether the correct options have the same text
+
+
+def shingles(question: Question) -> np.ndarray:
+    """Sorted unique hashes of the word shingles of the question and of each option."""
+    texts = [question.question, *(_LABEL_RE.sub("", option) for option in question.options)]
+    hashes = set()
+    for text in texts:
+        words = _WORD_RE.findall(text.lower())
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1)):
+            hashes.add(zlib.crc32(" ".join(words[i : i + SHINGLE_SIZE]).encode("utf-8")))
+    return np.array(sorted(hashes), dtype=np.uint64)
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    if not len(hashes):
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint64)
+    values = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE
+    return (values & np.uint64(0xFFFFFFFF)).min(axis=1)
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    union = len(a) + len(b)
+    if not union:
+        return 1.0
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (union - common)
+
+
+def _answer_texts(question: Question) -> frozenset[str]:
+    answers = question.answer if isinstance(question.answer, list) else [question.answer]
+    return frozenset(
+        " ".join(_WORD_RE.findall(_LABEL_RE.sub("", question.options[a]).lower()))
+        for a in answers
+        if 0 <= a < len(question.options)
+    )
+
+
+def check_question(line: int, q: Question) -> list[Issue]:
+    """Checks of a single parsed question that the schema does not cover."""
+    issues = []
+
+    def issue(severity, check, message):
+        issues.append(Issue(line=line, id=q.id, severity=severity, check=check, message=message))
+
+    answers = q.answer if isinstance(q.answer, list) else [q.answer]
+    if not q.question.strip():
+        issue("error", "empty_question", f"question {q.id} has no text")
+    if len(q.options) < 2:
+        issue("error", "options", f"question {q.id} has {len(q.options)} options")
+    if not answers:
+        issue("error", "answer_range", f"question {q.id} has no answer")
+    out_of_range = [a for a in answers if a < 0 or a >= len(q.options)]
+    if out_of_range:
+        message = f"question {q.id} has answers {out_of_range} outside its {len(q.options)} options"
+        issue("error", "answer_range", message)
+    if len(set(answers)) != len(answers):
+        issue("warning", "answer_repeated", f"question {q.id} lists an answer twice: {answers}")
+    if q.mode == "single_choice" and len(answers) != 1:
+        issue("error", "mode", f"single choice question {q.id} has {len(answers)} answers")
+    elif q.mode == "multiple_choice" and not isinstance(q.answer, list):
+        issue("warning", "mode", f"multiple choice question {q.id} has a single answer index")
+    elif q.mode == "multiple_choice" and len(answers) < 2:
+        issue("warning", "mode", f"multiple choice question {q.id} has only {len(answers)} answer")
+    normalized = [_LABEL_RE.sub("", option).strip().lower() for option in q.options]
+    if len(set(normalized)) != len(normalized):
+        issue("warning", "options_repeated", f"question {q.id} repeats an option")
+    return issues
+
+
+class ValidationReport:
+    """Result of ``validate``: issues, near-duplicate pairs and the clusters they form."""
+
+    def __init__(self, path: Path, issues: list[Issue], duplicates: list[DuplicatePair], count: int):
+        self.path = path
+        self.issues = issues
+        self.duplicates = duplicates
+        self.count = count
+
+    @property
+    def errors(self) -> list[Issue]:
+        return [issue for issue in self.issues if issue.severity == "error"]
+
+    def clusters(self, same_answer_only: bool = True) -> list[list[int]]:
+        """Groups of near-duplicate question ids, each sorted, linked transitively."""
+        parent: dict[int, int] = {}
+
+        def find(x):
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for pair in self.duplicates:
+            if pair.same_answer or not same_answer_only:
+                parent[find(pair.second)] = find(pair.first)
+        groups: dict[int, list[int]] = defaultdict(list)
+        for question_id in list(parent):
+            groups[find(question_id)].append(question_id)
+        return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "file": str(self.path),
+            "questions": self.count,
+            "errors": len(self.errors),
+            "warnings": len(self.issues) - len(self.errors),
+            "issues": [issue.model_dump() for issue in self.issues],
+            "duplicates": [pair.model_dump() for pair in self.duplicates],
+            "clusters": self.clusters(),
+        }
+
+
+def validate(path: Path, threshold: float = THRESHOLD) -> ValidationReport:
+    """Check every line of ``path`` and find questions at least ``threshold`` similar."""
+    issues: list[Issue] = []
+    first_line: dict[int, int] = {}
+    questions: list[Question] = []
+    hashes: list[np.ndarray] = []
+    buckets: dict[tuple[int, bytes], list[int]] = defaultdict(list)
+
+    with path.open("rb") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                issues.append(Issue(line=lineno, severity="error", check="json", message=f"invalid JSON: {e}"))
+                continue
+            record_id = record.get("id") if isinstance(record, dict) else None
+            try:
+                q = Question.model_validate(record)
+            except ValidationError as e:
+                fields = ", ".join(".".join(map(str, error["loc"])) for error in e.errors())
+                record_id = record_id if isinstance(record_id, int) else None
+                message = f"invalid fields: {fields}"
+                issues.append(Issue(line=lineno, id=record_id, severity="error", check="schema", message=message))
+                continue
+            if q.id in first_line:
+                message = f"duplicate id {q.id} (first on line {first_line[q.id]})"
+                issues.append(Issue(line=lineno, id=q.id, severity="error", check="duplicate_id", message=message))
+                continue
+            first_line[q.id] = lineno
+            issues.extend(check_question(lineno, q))
+
+            position = len(questions)
+            questions.append(q)
+            hashes.append(shingles(q))
+            signature = minhash(hashes[-1])
+            for band in range(BANDS):
+                buckets[(band, signature[band * ROWS : (band + 1) * ROWS].tobytes())].append(position)
+
+    candidates = set()
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1 :]:
+                candidates.add((a, b))
+    duplicates = []
+    for a, b in sorted(candidates):
+        similarity = jaccard(hashes[a], hashes[b])
+        if similarity >= threshold:
+            qa, qb = sorted((questions[a], questions[b]), key=lambda q: q.id)
+            same_answer = _answer_texts(qa) == _answer_texts(qb)
+            duplicates.append(
+                DuplicatePair(first=qa.id, second=qb.id, similarity=round(similarity, 4), same_answer=same_answer)
+            )
+            if not same_answer:
+                message = f"question {qb.id} duplicates {qa.id} but has a different correct answer"
+                line = first_line[qb.id]
+                issues.append(Issue(line=line, id=qb.id, severity="warning", check="conflict", message=message))
+    logger.info(f"Compared {len(candidates)} candidate pairs of {len(questions)} questions")
+    duplicates.sort(key=lambda pair: (-pair.similarity, pair.first, pair.second))
+    issues.sort(key=lambda issue: issue.line)
+    return ValidationReport(path, issues, duplicates, len(first_line))
+
+
+def merge_duplicates(path: Path, report: ValidationReport, output: Path) -> dict[int, int]:
+    """Write ``path`` to ``output`` with each duplicate cluster folded into its lowest id.
+
+    The kept question gets the union of the cluster's tags and, if it has none, the first
+    explanation found. Only duplicates with the same correct answer are merged, and lines
+    with errors are copied unchanged. Returns the dropped ids mapped to the kept ones.
+    """
+    merged_into = {question_id: cluster[0] for cluster in report.clusters() for question_id in cluster[1:]}
+    records: dict[int, dict] = {}
+    lines: list[tuple[int | None, bytes]] = []
+    with path.open("rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                question_id = record["id"] if isinstance(record["id"], int) else None
+            except (ValueError, TypeError, KeyError):
+                question_id = None
+            if question_id is not None and question_id not in records:
+                records[question_id] = record
+            lines.append((question_id, line if line.endswith(b"\n") else line + b"\n"))
+
+    changed = set()
+    for dropped, kept in merged_into.items():
+        target, source = records[kept], records[dropped]
+        for field in TAG_FIELDS:
+            values = target.setdefault(field, [])
+            new = [value for value in source.get(field, []) if value not in values]
+            values.extend(new)
+            if new:
+                changed.add(kept)
+        if not target.get("explanation") and source.get("explanation"):
+            target["explanation"] = source["explanation"]
+            changed.add(kept)
+
+    with atomic_writer(output, "wb") as f:
+        for question_id, line in lines:
+            if question_id in merged_into:
+                continue
+            if question_id in changed:
+                changed.discard(question_id)  # later lines with the same id are copied as they are
+                f.write((json.dumps(records[question_id]) + "\n").encode("utf-8"))
+            else:
+                f.write(line)
+    logger.info(f"Wrote {output}, {len(merged_into)} duplicates merged")
+    return merged_into
+
+
+def print_report(report: ValidationReport):
+    for issue in report.issues:
+        print(issue)
+    for pair in report.duplicates:
+        answer = "same answer" if pair.same_answer else "DIFFERENT answer"
+        print(f"questions {pair.first} and {pair.second} are {pair.similarity:.0%} similar ({answer})")
+    print(
+        f"{report.count} questions: {len(report.errors)} errors, {len(report.issues) - len(report.errors)} warnings, "
+        f"{len(report.duplicates)} near-duplicate pairs in {len(report.clusters())} clusters."
+    )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Check a question file and find near-duplicate questions.")
+    parser.add_argument("quizzes", type=Path, nargs="?", default=Path("data/quizzes.jsonl"))
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Jaccard similarity of duplicates")
+    parser.add_argument("--report", type=Path, help="write the full report as JSON")
+    parser.add_argument("--merged", type=Path, help="write the bank with duplicates merged to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    report = validate(args.quizzes, args.threshold)
+    print_report(report)
+    if args.report:
+        with atomic_writer(args.report) as f:
+            json.dump(report.to_dict(), f, indent=2)
+    if args.merged:
+        merge_duplicates(args.quizzes, report, args.merged)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from pathlib import Path
 import streamlit as st
 
 from dashboard import show_dashboard
-from utils import reset_progress, save_progress, set_css_style
+from utils import reset_progress, save_progress, select_bank, set_css_style
 
 st.set_page_config(page_title="Quiz Learner", initial_sidebar_state="collapsed", layout="wide")
 
@@ -12,6 +12,7 @@ def main():
     st.set_page_config(page_title="Quiz Learner", initial_sidebar_state="collapsed", layout="wide")
 
     set_css_style(Path("style.css"))
+    bank = select_bank()
 
     st.title("Quiz Learner — Dashboard")
 
@@ -21,11 +22,11 @@ def main():
     with col1:
         if st.button("▶️ Start", type="primary"):
             if stats["total"] == 0:
-                st.warning("⚠️ No quizzes found in data/quizzes.jsonl")
+                st.warning(f"⚠️ No quizzes found in {bank.quiz_file}")
                 return
             # initialize a flag and navigate to the Quiz Mode page
             st.session_state.quiz_in_progress = False
-            st.session_state.quizzes = None
+            st.session_state.quiz_round_ids = []
             st.session_state.quiz_mode_pos = 0
             st.session_state.quiz_mode_round_progress = {}
             st.session_state.quiz_mode_answered = False